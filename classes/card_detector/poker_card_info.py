@@ -9,6 +9,7 @@ class PokerCardInfo:
     def __init__(self):
         self.contour = []  # Contour of card
         self.width, self.height = 0, 0  # Width and height of card
+        self.corners = []  # Corner points of card approximated from contour
         self.center = []  # Center point of card
         self.rank_img = []  # Thresholded, sized image of card"s rank
         self.suit_img = []  # Thresholded, sized image of card"s suit
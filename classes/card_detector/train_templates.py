@@ -0,0 +1,12 @@
+import numpy as np
+
+
+class TrainTemplates:
+    """Structure to store all train rank and suit images stacked for batched matching."""
+
+    def __init__(self):
+        self.rank_imgs = np.empty((0, 0), dtype=np.uint8)  # One flattened (or bit-packed) rank image per row
+        self.suit_imgs = np.empty((0, 0), dtype=np.uint8)  # One flattened (or bit-packed) suit image per row
+        self.ranks = []  # CardRank of each row in rank_imgs
+        self.suits = []  # CardSuit of each row in suit_imgs
+        self.packed = False  # True if images are stored as bits (distance is XOR + popcount)
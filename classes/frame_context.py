@@ -0,0 +1,72 @@
+import cv2
+import numpy as np
+
+
+class FrameContext:
+    """Structure to share preprocessed variants of a camera frame between card and
+    chip detectors. Every variant is computed once, on first use. Contexts of
+    table regions mask the variants of the whole frame instead of converting
+    masked copies of the frame again."""
+
+    def __init__(self, frame: np.ndarray, mask: np.ndarray = None, parent=None):
+        self.frame = frame  # Whole, unmasked camera frame (BGR)
+        self.mask = mask  # Mask of the table region, None for the whole frame
+        self._parent: FrameContext = parent
+        self._variants = {}
+
+    def region(self, mask: np.ndarray):
+        """Returns context of the table region selected by mask."""
+
+        return FrameContext(self.frame, mask, parent=self)
+
+    @property
+    def gray(self) -> np.ndarray:
+        return self._variant("gray", lambda context: cv2.cvtColor(context.frame, cv2.COLOR_BGR2GRAY))
+
+    @property
+    def hsv(self) -> np.ndarray:
+        return self._variant("hsv", lambda context: cv2.cvtColor(context.frame, cv2.COLOR_BGR2HSV))
+
+    @property
+    def blurred_gray(self) -> np.ndarray:
+        """Grayscale frame blurred with 3x3 Gaussian kernel, used to find cards."""
+
+        return self._variant("blurred_gray", lambda context: cv2.GaussianBlur(context.gray, (3, 3), 0))
+
+    @property
+    def clahe_gray(self) -> np.ndarray:
+        """Grayscale frame with contrast limited adaptive histogram equalization,
+        which accounts for differences in lighting conditions, used to find chips."""
+
+        def compute(context):
+            clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
+            return clahe.apply(context.gray)
+
+        return self._variant("clahe_gray", compute)
+
+    def blurred_gray_at(self, scale: float) -> np.ndarray:
+        """Same as blurred_gray, computed from the frame resized by scale."""
+
+        if scale == 1.0:
+            return self.blurred_gray
+
+        def compute(context):
+            gray = cv2.resize(context.gray, (0, 0), fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+            return cv2.GaussianBlur(gray, (3, 3), 0)
+
+        return self._variant("blurred_gray_{}".format(scale), compute, scale)
+
+    def _variant(self, name: str, compute, scale: float = 1.0) -> np.ndarray:
+        # compute gets the context of the whole frame, regions mask its result
+        if name not in self._variants:
+            if self._parent is None:
+                self._variants[name] = compute(self)
+            else:
+                self._variants[name] = self._masked(self._parent._variant(name, compute, scale), scale)
+        return self._variants[name]
+
+    def _masked(self, variant: np.ndarray, scale: float) -> np.ndarray:
+        mask = self.mask
+        if scale != 1.0:
+            mask = cv2.resize(mask, (variant.shape[1], variant.shape[0]), interpolation=cv2.INTER_NEAREST)
+        return cv2.bitwise_and(variant, variant, mask=mask)
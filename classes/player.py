@@ -27,6 +27,14 @@ class Player:
             chip_sum += chip.value * self.chips[chip]
         return chip_sum
 
+    def __eq__(self, other):
+        # players of consecutive frames are equal if nothing changed, cards are interned
+        if not isinstance(other, Player):
+            return NotImplemented
+        return self.cards == other.cards and self.chips == other.chips and self.hand == other.hand
+
+    __hash__ = None
+
 
 def main():
     player = Player()
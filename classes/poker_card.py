@@ -1,26 +1,51 @@
 from enums.card_rank_enum import CardRank
 from enums.card_suit_enum import CardSuit
 
+# Known cards are encoded 0-51 as rank index * 4 + suit index, rank index 0 is
+# two and 12 is ace, suit index follows CardSuit (clubs, diamonds, hearts, spades)
+RANK_ORDER = [CardRank.two, CardRank.three, CardRank.four, CardRank.five, CardRank.six, CardRank.seven,
+              CardRank.eight, CardRank.nine, CardRank.ten, CardRank.jack, CardRank.queen, CardRank.king, CardRank.ace]
+SUIT_ORDER = [CardSuit.clubs, CardSuit.diamonds, CardSuit.hearts, CardSuit.spades]
+
+_RANK_INDEX = {rank: i for i, rank in enumerate(RANK_ORDER)}
+_SUIT_INDEX = {suit: i for i, suit in enumerate(SUIT_ORDER)}
+
 
 class PokerCard:
-    """Structure to store information about poker cards."""
+    """Structure to store information about poker cards. Cards are interned,
+    there is one instance per rank and suit, so cards compare and hash by
+    identity and can be used in sets and as dictionary keys."""
+
+    __slots__ = ("rank", "suit", "index", "_order")
+
+    _cards = {}
 
-    def __init__(self, rank: CardRank, suit: CardSuit):
-        self.rank: CardRank = rank
-        self.suit: CardSuit = suit
+    def __new__(cls, rank: CardRank, suit: CardSuit):
+        card = cls._cards.get((rank, suit))
+        if card is None:
+            card = super().__new__(cls)
+            card.rank = rank  # Rank of card
+            card.suit = suit  # Suit of card
+            card.index = _RANK_INDEX[rank] * 4 + _SUIT_INDEX[suit] if rank in _RANK_INDEX and suit in _SUIT_INDEX \
+                else -1  # Card encoded 0-51, -1 if rank or suit is unknown
+            card._order = suit.value * 16 + rank.value
+            cls._cards[(rank, suit)] = card
+        return card
+
+    @staticmethod
+    def from_index(index: int):
+        return PokerCard(RANK_ORDER[index >> 2], SUIT_ORDER[index & 3])
+
+    def __reduce__(self):
+        # unpickled cards are interned as well
+        return PokerCard, (self.rank, self.suit)
 
     def __repr__(self):
         return self.rank.name + " of " + self.suit.name
 
-    def __eq__(self, other):
-        return self.rank == other.rank and self.suit == other.suit
-
     def __lt__(self, other):
-        if self.suit.value < other.suit.value:
-            return True
-        if self.rank.value < other.rank.value:
-            return True
-        return False
+        # cards are ordered by suit, then by rank
+        return self._order < other._order
 
     def is_unknown(self) -> bool:
-        return self.rank == CardRank.unknown or self.suit == CardSuit.unknown
+        return self.index < 0
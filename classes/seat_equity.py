@@ -0,0 +1,10 @@
+class SeatEquity:
+    """Structure to store winning chances of one seat."""
+
+    def __init__(self, win: float = 0.0, tie: float = 0.0, equity: float = 0.0):
+        self.win = win  # Probability to win the pot alone
+        self.tie = tie  # Probability to split the pot with other seats
+        self.equity = equity  # Expected share of the pot, wins plus split shares
+
+    def __repr__(self):
+        return "win {:.1%}, tie {:.1%}".format(self.win, self.tie)
@@ -35,6 +35,11 @@ class ChipClassifierGeneratorUi(Tk):
 
         train_label.pack(padx=5, pady=5)
 
+        self._update_value = BooleanVar()
+        update_check = ttk.Checkbutton(self, text="Only add new samples to existing classifier",
+                                       variable=self._update_value)
+        update_check.pack(padx=5, pady=5, anchor=W)
+
         self.resizable(False, False)
 
     def _browse_files(self):
@@ -46,9 +51,14 @@ class ChipClassifierGeneratorUi(Tk):
         output_filename: str = self._out_text.get()
 
         try:
-            chip_detection.generate_classifier(sample_images_path, output_filename)
-            tk_msg.showinfo("Training finished",
-                            "Classifier has been trained and saved to: {}.".format(output_filename))
+            if self._update_value.get():
+                count = chip_detection.update_classifier(sample_images_path, output_filename)
+                tk_msg.showinfo("Training finished",
+                                "{} new samples have been added to: {}.".format(count, output_filename))
+            else:
+                chip_detection.generate_classifier(sample_images_path, output_filename)
+                tk_msg.showinfo("Training finished",
+                                "Classifier has been trained and saved to: {}.".format(output_filename))
         except FileNotFoundError:
             tk_msg.showerror("Samples not found", "Samples not found in: {}.".format(sample_images_path))
 
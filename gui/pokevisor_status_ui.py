@@ -7,6 +7,7 @@ from classes.poker_card import PokerCard
 from enums.card_rank_enum import CardRank
 from enums.card_suit_enum import CardSuit
 from enums.poker_chip_enum import PokerChip
+from logic.hand_selecter import equity_calculation
 
 card_rank_symbols = {
     CardRank.unknown.name: "u",
@@ -42,6 +43,7 @@ class PokeVisorStatusUi(Tk):
         self._initialize_table(players)
         self._prev_community_cards: list = None
         self._prev_list_of_players: list = None
+        self._prev_equity_cards: list = None
 
     def _initialize_table(self, players: int):
         community_cards_column1 = Entry(self, width=50)
@@ -62,6 +64,7 @@ class PokeVisorStatusUi(Tk):
         self._player_cards_list = []
         self._player_chips_list = []
         self._player_hand_list = []
+        self._player_equity_list = []
         for i in range(players):
             player_column1 = Entry(self, width=50)
             player_column1.config({"background": "#dcf2e8", "font": "bold"})
@@ -83,9 +86,15 @@ class PokeVisorStatusUi(Tk):
             player_column3.config({"background": "#ffffff", "font": "bold"})
             player_column3.grid(row=i + 2, column=4, sticky=NSEW)
 
+            player_equity = StringVar()
+            player_column5 = Entry(self, textvariable=player_equity)
+            player_column5.config({"background": "#ffffff", "font": "bold"})
+            player_column5.grid(row=i + 2, column=5, sticky=NSEW)
+
             self._player_cards_list.append(player_cards)
             self._player_chips_list.append(player_chips)
             self._player_hand_list.append(player_hand)
+            self._player_equity_list.append(player_equity)
 
     def write_turn(self, community_cards: List[PokerCard], list_of_players: List[Player]):
         update = False
@@ -118,6 +127,7 @@ class PokeVisorStatusUi(Tk):
 
         if list_of_players != self._prev_list_of_players:
             update = True
+            self._prev_list_of_players = list_of_players
             for i in range(len(list_of_players)):
                 player = list_of_players[i]
                 cards = ""
@@ -128,9 +138,26 @@ class PokeVisorStatusUi(Tk):
 
                 self._player_chips_list[i].set("has {} value in chips".format(player.sum_chip_values()))
                 self._player_hand_list[i].set(str(player.hand))
+
+        # equity changes with every street, even if players did not change
+        self._write_equity(community_cards, list_of_players)
         if update:
             self.update()
 
+    def _write_equity(self, community_cards: List[PokerCard], list_of_players: List[Player]):
+        # equity only changes with a new street or new player cards
+        equity_cards = [community_cards] + [player.cards for player in list_of_players]
+        if equity_cards == self._prev_equity_cards:
+            return
+        self._prev_equity_cards = equity_cards
+
+        if len(list_of_players) == 0:
+            return
+
+        equities = equity_calculation.calculate_equity([player.cards for player in list_of_players], community_cards)
+        for i in range(len(list_of_players)):
+            self._player_equity_list[i].set(str(equities[i]))
+
 
 def main():
     card_1 = PokerCard(CardRank.ace, CardSuit.hearts)
@@ -0,0 +1,36 @@
+import time
+
+import cv2
+import numpy as np
+
+from logic.chip_detector.chip_detection import CHIP_ROI_SIZE
+
+
+def time_function(function, repeats: int) -> float:
+    """Returns average duration of function in seconds over repeats calls."""
+
+    start_time = time.perf_counter()
+    for _ in range(repeats):
+        function()
+    return (time.perf_counter() - start_time) / repeats
+
+
+def load_chip_rois(files: list) -> np.ndarray:
+    """Loads chip sample images as stacked HSV regions of interest, sized like
+    the ones chip detection classifies."""
+
+    rois = np.empty((len(files), CHIP_ROI_SIZE[1], CHIP_ROI_SIZE[0], 3), dtype=np.uint8)
+    for i, file in enumerate(files):
+        img = cv2.imread(file)
+        if img is None:
+            raise FileNotFoundError(file)
+        rois[i] = cv2.cvtColor(cv2.resize(img, CHIP_ROI_SIZE), cv2.COLOR_BGR2HSV)
+    return rois
+
+
+def repeat_files(files: list, count: int) -> list:
+    """Returns count files, repeating files if there are fewer."""
+
+    if len(files) == 0:
+        raise FileNotFoundError
+    return [files[i % len(files)] for i in range(count)]
@@ -9,14 +9,43 @@ import numpy as np
 
 # Define font to use
 from classes.card_detector.poker_card_info import PokerCardInfo
+from classes.card_detector.train_templates import TrainTemplates
+from classes.frame_context import FrameContext
 from logic.card_detector import card_detection_functions
+from logic.card_detector.card_tracking import CardTracker
 
 font = cv2.FONT_HERSHEY_SIMPLEX
 
-# Load the train rank and suit images
-path = os.getcwd()
-train_ranks = card_detection_functions.load_ranks(path + "/sample_images/")
-train_suits = card_detection_functions.load_suits(path + "/sample_images/")
+# Rank and suit images the bundle is compiled from, if it does not exist yet
+SAMPLE_IMAGES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sample_images", "")
+DEFAULT_TEMPLATES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "card_templates.npz")
+
+# Train rank and suit templates are loaded on the first detection
+_templates_path = DEFAULT_TEMPLATES_PATH
+_train_templates: TrainTemplates = None
+
+
+def setup(templates_path: str = DEFAULT_TEMPLATES_PATH) -> None:
+    """Sets path of the template bundle, which is loaded on the first detection."""
+    global _templates_path, _train_templates
+
+    _templates_path = templates_path
+    _train_templates = None
+
+
+def _get_train_templates() -> TrainTemplates:
+    global _train_templates
+
+    if _train_templates is None:
+        _train_templates = card_detection_functions.load_template_bundle(_templates_path)
+
+    if _train_templates is None:
+        card_detection_functions.compile_template_bundle(SAMPLE_IMAGES_PATH, _templates_path)
+        _train_templates = card_detection_functions.load_template_bundle(_templates_path)
+        if _train_templates is None:
+            raise FileNotFoundError("Template bundle could not be loaded after compiling: {}".format(_templates_path))
+
+    return _train_templates
 
 
 def _remove_non_card_contours(cnts_sort: list, cnt_is_card: np.ndarray):
@@ -34,46 +63,85 @@ def _remove_non_card_contours(cnts_sort: list, cnt_is_card: np.ndarray):
     return cnts_sort_result, cnt_is_card
 
 
-def _remove_inclusive_contours(cnts_sort: list, cnt_is_card: np.ndarray):
-    contour_removed = True
-    cnts_sort_result = cnts_sort
+def _remove_inclusive_contours(cnts_sort: list, cnt_is_card: np.ndarray, parent_sort: list) -> np.ndarray:
+    """Unmarks card contours lying inside another card contour. Contours found
+    by findContours never cross, so one contour is inside another exactly when
+    the other is its ancestor in the RETR_TREE hierarchy."""
 
-    while contour_removed:
-        contour_removed = False
-        for i in range(len(cnts_sort_result)):
-            for j in range(0, len(cnts_sort_result)):
-                if j == i:
-                    continue
-
-                all_points_inside = True
-                for point in cnts_sort_result[i]:
-                    dist = cv2.pointPolygonTest(cnts_sort[j], tuple(point[0]), False)
-                    if dist < 0:
-                        all_points_inside = False
-                        break
-
-                if all_points_inside:
-                    cnts_sort.pop(i)
-                    cnt_is_card = np.delete(cnt_is_card, i)
-                    contour_removed = True
-                    break
-            if contour_removed:
-                break
-    return cnts_sort_result, cnt_is_card
+    cnt_is_card = cnt_is_card.copy()
+
+    # Nearest card ancestor of contours, -1 if there is none. Only the chains
+    # above card contours are walked, and every contour on them only once.
+    card_ancestor = {}
+    card_indices = np.flatnonzero(cnt_is_card)
+    for i in card_indices:
+        chain = []
+        j = i
+        while j >= 0 and j not in card_ancestor:
+            chain.append(j)
+            j = parent_sort[j]
+
+        for k in reversed(chain):
+            parent = parent_sort[k]
+            if parent < 0:
+                card_ancestor[k] = -1
+            elif cnt_is_card[parent] == 1:
+                card_ancestor[k] = parent
+            else:
+                card_ancestor[k] = card_ancestor[parent]
+
+    for i in card_indices:
+        ancestor = card_ancestor[i]
+        if ancestor < 0:
+            continue
 
+        # Bounding box prefilter, the ancestor has to cover the whole contour
+        x1, y1, w1, h1 = cv2.boundingRect(cnts_sort[i])
+        x2, y2, w2, h2 = cv2.boundingRect(cnts_sort[ancestor])
+        if x2 <= x1 and y2 <= y1 and x1 + w1 <= x2 + w2 and y1 + h1 <= y2 + h2:
+            cnt_is_card[i] = 0
 
-def detect_cards(image, dst=None) -> tuple:
-    # Pre-process camera image (gray, blur, and threshold it)
-    pre_proc = card_detection_functions.preprocess_image(image)
+    return cnt_is_card
+
+
+def _scale_contour(cnt: np.ndarray, scale: float) -> np.ndarray:
+    # Pixel centers are scaled, same as in cv2.resize
+    return np.int32(np.round((cnt + 0.5) * scale - 0.5))
+
+
+def detect_cards(image, dst=None, tracker: CardTracker = None, scale: float = None,
+                 context: FrameContext = None) -> tuple:
+    cards = detect_card_infos(image, dst, tracker, scale, context)
+    return [card.to_poker_card() for card in cards], [card.contour for card in cards]
+
+
+def detect_card_infos(image, dst=None, tracker: CardTracker = None, scale: float = None,
+                      context: FrameContext = None) -> List[PokerCardInfo]:
+    if scale is None:
+        scale = card_detection_functions.CONTOUR_SCALE
+
+    # Grayed and blurred image may be shared with other detectors
+    if context is None:
+        context = FrameContext(image)
+
+    # Pre-process camera image (gray, blur, and threshold it), reduced to the
+    # contour scale, cards are big enough to be found in a smaller image
+    pre_proc = card_detection_functions.threshold_image(context.blurred_gray_at(scale))
 
     # Find and sort the contours of all cards in the image (poker cards)
-    cnts_sort, cnt_is_card = card_detection_functions.find_cards(pre_proc)
+    cnts_sort, cnt_is_card, parent_sort = card_detection_functions.find_cards(pre_proc, scale)
 
     if not np.any(cnt_is_card):
-        return [], []
+        if tracker is not None:
+            tracker.update([])
+        return []
 
+    cnt_is_card = _remove_inclusive_contours(cnts_sort, cnt_is_card, parent_sort)
     cnts_sort, cnt_is_card = _remove_non_card_contours(cnts_sort, cnt_is_card)
-    cnts_sort, cnt_is_card = _remove_inclusive_contours(cnts_sort, cnt_is_card)
+
+    # Rank and suit are isolated from the full resolution image
+    if scale != 1.0:
+        cnts_sort = [_scale_contour(cnt, 1 / scale) for cnt in cnts_sort]
 
     # Initialize a new "cards" list to store the card objects.
     cards: List[PokerCardInfo] = []
@@ -81,27 +149,45 @@ def detect_cards(image, dst=None) -> tuple:
     # If there are no contours, do nothing
     if len(cnts_sort) != 0:
 
-        # Initialize a new "cards" list to assign the card objects.
-        # k indexes the newly made array of cards.
-        k = 0
+        # Cards which have to be classified in this frame
+        new_cards: List[PokerCardInfo] = []
 
         # For each contour detected:
         for i in range(len(cnts_sort)):
             # Create a card object from the contour and append it to the list of cards.
-            # preprocess_card function takes the card contour and contour and
-            # determines the cards properties (corner points, etc). It generates a
-            # flattened 200x300 image of the card, and isolates the card"s
-            # suit and rank from the image.
-            cards.append(card_detection_functions.preprocess_card(cnts_sort[i], image))
-
-            # Find the best rank and suit match for the card.
-            cards[k].best_rank_match, cards[k].best_suit_match, cards[k].rank_diff, cards[
-                k].suit_diff = card_detection_functions.match_card(cards[k], train_ranks, train_suits)
-
-            # Draw center point and match result on the image.
-            if dst is not None:
-                dst = card_detection_functions.draw_results(dst, cards[k])
-            k = k + 1
+            # locate_card function takes the card contour and determines the cards
+            # properties (corner points, etc).
+            card = card_detection_functions.locate_card(cnts_sort[i])
+            cards.append(card)
+
+            # Corners from a reduced image are refined in the full resolution image.
+            if scale != 1.0:
+                card_detection_functions.refine_corners(card, context.frame, round(3 / scale))
+
+            # Card which did not move since the previous frame keeps its identity.
+            previous = tracker.find(card) if tracker is not None else None
+            if previous is not None:
+                card.rank_img, card.suit_img = previous.rank_img, previous.suit_img
+                card.best_rank_match, card.best_suit_match = previous.best_rank_match, previous.best_suit_match
+                card.rank_diff, card.suit_diff = previous.rank_diff, previous.suit_diff
+                continue
+
+            # Otherwise flatten the card and isolate its suit and rank from the image.
+            card_detection_functions.isolate_rank_and_suit(card, context.frame)
+            new_cards.append(card)
+
+        # Find the best rank and suit match for all new cards at once.
+        matches = card_detection_functions.match_cards(new_cards, _get_train_templates())
+        for card, match in zip(new_cards, matches):
+            card.best_rank_match, card.best_suit_match, card.rank_diff, card.suit_diff = match
+
+        if tracker is not None:
+            tracker.update(cards)
+
+        # Draw center point and match result on the image.
+        if dst is not None:
+            for card in cards:
+                dst = card_detection_functions.draw_results(dst, card)
 
         # Draw card contours on image (have to do contours all at once or
         # they do not show up properly for some reason)
@@ -111,4 +197,4 @@ def detect_cards(image, dst=None) -> tuple:
                 for i in range(len(cards)):
                     temp_cnts.append(cards[i].contour)
                 cv2.drawContours(dst, temp_cnts, -1, (255, 0, 0), 2)
-    return [card.to_poker_card() for card in cards], [card.contour for card in cards]
+    return cards
@@ -5,7 +5,7 @@ import argparse
 
 import cv2
 
-from logic.card_detector import card_detection
+from logic.card_detector import card_detection, card_detection_functions
 
 
 def parse_arguments():
@@ -22,6 +22,7 @@ def main():
     cards = card_detection.detect_cards(image, image)
 
     print(cards)
+    print("Card candidates per stage: {}".format(card_detection_functions.candidate_counts))
 
     # Finally, display the image with the identified cards
     cv2.imshow("Card Detector", image)
@@ -3,6 +3,7 @@
 #
 import json
 import os
+from typing import Optional
 
 import cv2
 import numpy as np
@@ -10,9 +11,11 @@ import numpy as np
 from classes.card_detector.poker_card_info import PokerCardInfo
 from classes.card_detector.train_ranks import TrainRanks
 from classes.card_detector.train_suits import TrainSuits
+from classes.card_detector.train_templates import TrainTemplates
 # Adaptive threshold levels
 from enums.card_rank_enum import CardRank
 from enums.card_suit_enum import CardSuit
+from logic.npz_files import save_npz
 
 # Constants #
 
@@ -37,17 +40,30 @@ SUIT_DIFF_MAX = 700
 CARD_MAX_AREA = 240000
 CARD_MIN_AREA = 12500
 
+# Scale of the image in which card contours are found, card areas scale with its square
+CONTOUR_SCALE = 1.0
+
 font = cv2.FONT_HERSHEY_SIMPLEX
 
+# Version of the compiled template bundle format, bundles with other version are compiled again
+TEMPLATE_BUNDLE_VERSION = 1
+
+# Number of contours left after each candidate stage of the last find_cards call
+candidate_counts = {"contours": 0, "bounding_box": 0, "area": 0, "quad": 0}
+
+# Number of set bits in every byte value, used to count differing pixels of bit-packed images
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint16)
+
 
 def _load_settings():
-    global CARD_MAX_AREA, CARD_MIN_AREA
+    global CARD_MAX_AREA, CARD_MIN_AREA, CONTOUR_SCALE
 
     if os.path.isfile("config.json"):
         with open("config.json", "r") as file:
             settings = json.loads(file.read())["card-detector"]
         CARD_MAX_AREA = settings["card-max-area"]
         CARD_MIN_AREA = settings["card-min-area"]
+        CONTOUR_SCALE = settings.get("contour-scale", CONTOUR_SCALE)
 
 
 _load_settings()
@@ -91,62 +107,158 @@ def load_suits(filepath):
     return train_suits
 
 
+def compile_template_bundle(sample_images_path: str, output_filename: str) -> None:
+    """Loads rank and suit images from directory specified by sample_images_path
+    and packs them into a single versioned template bundle file."""
+
+    train_ranks = load_ranks(sample_images_path)
+    train_suits = load_suits(sample_images_path)
+
+    if any(t.img is None for t in train_ranks + train_suits):
+        raise FileNotFoundError("Rank or suit images not found in: {}".format(sample_images_path))
+
+    save_npz(output_filename, compressed=True,
+             version=TEMPLATE_BUNDLE_VERSION,
+             ranks=[t_rank.rank.value for t_rank in train_ranks],
+             rank_imgs=np.stack([t_rank.img for t_rank in train_ranks]),
+             suits=[t_suit.suit.value for t_suit in train_suits],
+             suit_imgs=np.stack([t_suit.img for t_suit in train_suits]))
+
+
+def load_template_bundle(filename: str, packed: bool = False) -> Optional[TrainTemplates]:
+    """Loads template bundle created by compile_template_bundle. Returns None
+    if the file does not exist or was compiled with another version."""
+
+    if not os.path.isfile(filename):
+        return None
+
+    with np.load(filename) as bundle:
+        if int(bundle["version"]) != TEMPLATE_BUNDLE_VERSION:
+            return None
+
+        train_ranks = []
+        for value, img in zip(bundle["ranks"], bundle["rank_imgs"]):
+            train_ranks.append(TrainRanks())
+            train_ranks[-1].rank = CardRank(int(value))
+            train_ranks[-1].img = img
+
+        train_suits = []
+        for value, img in zip(bundle["suits"], bundle["suit_imgs"]):
+            train_suits.append(TrainSuits())
+            train_suits[-1].suit = CardSuit(int(value))
+            train_suits[-1].img = img
+
+    return stack_templates(train_ranks, train_suits, packed)
+
+
+def stack_templates(train_ranks, train_suits, packed: bool = False) -> TrainTemplates:
+    """Stacks train rank and suit images into single arrays, so every card can be
+    matched against every template in one call. If packed is set, images are
+    binarized and stored as bits, so the difference becomes XOR + popcount."""
+
+    # Images that failed to load are left out, they can never be matched anyway
+    train_ranks = [t_rank for t_rank in train_ranks if t_rank.img is not None]
+    train_suits = [t_suit for t_suit in train_suits if t_suit.img is not None]
+
+    templates = TrainTemplates()
+    templates.ranks = [t_rank.rank for t_rank in train_ranks]
+    templates.suits = [t_suit.suit for t_suit in train_suits]
+    templates.rank_imgs = _stack_images([t_rank.img for t_rank in train_ranks], packed)
+    templates.suit_imgs = _stack_images([t_suit.img for t_suit in train_suits], packed)
+    templates.packed = packed
+    return templates
+
+
 def preprocess_image(image):
     """Returns a grayed, blurred, and adaptively thresholded camera image."""
 
     gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
     blur = cv2.GaussianBlur(gray, (3, 3), 0)
 
-    thresh = cv2.adaptiveThreshold(blur, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY_INV, 5, 2)
+    return threshold_image(blur)
+
+
+def threshold_image(blurred_gray):
+    """Returns adaptively thresholded grayed and blurred camera image."""
+
+    thresh = cv2.adaptiveThreshold(blurred_gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY_INV, 5, 2)
     return thresh
 
 
-def find_cards(thresh_image):
-    """Finds all card-sized contours in a thresholded camera image.
-    Returns the number of cards, and a list of card contours sorted
-    from largest to smallest."""
+def find_cards(thresh_image, scale: float = 1.0):
+    """Finds all card-sized contours in a thresholded camera image, which
+    was resized by scale. Returns a list of contours sorted from largest
+    to smallest, flags marking which of them are cards, and the sorted
+    index of the parent of every contour (-1 if it has none). Number of
+    contours left after each candidate stage is stored in candidate_counts."""
+
+    min_area = CARD_MIN_AREA * scale ** 2
+    max_area = CARD_MAX_AREA * scale ** 2
 
-    # Find contours and sort their indices by contour size
+    # Find contours
     cnts, hier = cv2.findContours(thresh_image, cv2.RETR_TREE, cv2.CHAIN_APPROX_SIMPLE)
-    index_sort = sorted(range(len(cnts)), key=lambda i: cv2.contourArea(cnts[i]), reverse=True)
+    candidate_counts.update(contours=len(cnts), bounding_box=0, area=0, quad=0)
 
     # If there are no contours, do nothing
     if len(cnts) == 0:
-        return [], []
-
-    # Otherwise, initialize empty sorted contour and hierarchy lists
-    cnts_sort = []
-    hier_sort = []
+        return [], [], []
+
+    # Stage 1: bounding box area is never smaller than contour area, so
+    # contours with too small bounding box can not be cards. Boxes of all
+    # contours are computed at once from their concatenated points.
+    lengths = np.fromiter((len(cnt) for cnt in cnts), dtype=int, count=len(cnts))
+    points = np.concatenate(cnts).reshape(-1, 2)
+    starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    box_sizes = np.maximum.reduceat(points, starts) - np.minimum.reduceat(points, starts) + 1
+    box_candidates = np.flatnonzero(box_sizes[:, 0] * box_sizes[:, 1] > min_area)
+
+    # Stage 2: compute contour area once, only for remaining contours
+    areas = np.zeros(len(cnts))
+    for i in box_candidates:
+        areas[i] = cv2.contourArea(cnts[i])
+    area_candidates = np.flatnonzero((areas > min_area) & (areas < max_area))
+
+    # Sort contour indices by contour size
+    index_sort = np.argsort(-areas, kind="stable")
+    cnts_sort = [cnts[i] for i in index_sort]
+
+    # Position of every contour in the sorted list. Parent indices are
+    # translated to it, so the hierarchy can be used to check which
+    # contours lie inside other contours.
+    sorted_position = np.empty(len(cnts), dtype=int)
+    sorted_position[index_sort] = np.arange(len(cnts))
+    parents = hier[0][:, 3]
+    parent_sort = np.where(parents >= 0, sorted_position[parents], -1)[index_sort].tolist()
+
+    # Stage 3: determine which of the remaining contours are cards by
+    # checking if they have four corners
     cnt_is_card = np.zeros(len(cnts), dtype=int)
+    for i in area_candidates:
+        peri = cv2.arcLength(cnts[i], True)
+        approx = cv2.approxPolyDP(cnts[i], 0.01 * peri, True)
 
-    # Fill empty lists with sorted contour and sorted hierarchy. Now,
-    # the indices of the contour list still correspond with those of
-    # the hierarchy list. The hierarchy array can be used to check if
-    # the contours have parents or not.
-    for i in index_sort:
-        cnts_sort.append(cnts[i])
-        hier_sort.append(hier[0][i])
-
-    # Determine which of the contours are cards by applying the
-    # following criteria: 1) Smaller area than the maximum card size,
-    # 2), bigger area than the minimum card size, 3) have no parents,
-    # and 4) have four corners
+        if len(approx) == 4:
+            cnt_is_card[sorted_position[i]] = 1
 
-    for i in range(len(cnts_sort)):
-        size = cv2.contourArea(cnts_sort[i])
-        peri = cv2.arcLength(cnts_sort[i], True)
-        approx = cv2.approxPolyDP(cnts_sort[i], 0.01 * peri, True)
+    candidate_counts.update(bounding_box=len(box_candidates), area=len(area_candidates),
+                            quad=int(np.sum(cnt_is_card)))
 
-        if CARD_MAX_AREA > size > CARD_MIN_AREA and len(approx) == 4:
-            cnt_is_card[i] = 1
-
-    return cnts_sort, cnt_is_card
+    return cnts_sort, cnt_is_card, parent_sort
 
 
 def preprocess_card(contour, image) -> PokerCardInfo:
     """Uses contour to find information about the poker card. Isolates rank
     and suit images from the card."""
 
+    card_info = locate_card(contour)
+    isolate_rank_and_suit(card_info, image)
+    return card_info
+
+
+def locate_card(contour) -> PokerCardInfo:
+    """Uses contour to find corner points, size and center of the poker card,
+    without looking at the image."""
+
     # Initialize new card_info object
     card_info = PokerCardInfo()
 
@@ -156,6 +268,7 @@ def preprocess_card(contour, image) -> PokerCardInfo:
     peri = cv2.arcLength(contour, True)
     approx = cv2.approxPolyDP(contour, 0.01 * peri, True)
     pts = np.float32(approx)
+    card_info.corners = pts
 
     # Find width and height of card"s bounding rectangle
     x, y, w, h = cv2.boundingRect(contour)
@@ -167,11 +280,43 @@ def preprocess_card(contour, image) -> PokerCardInfo:
     cent_y = int(average[0][1])
     card_info.center = [cent_x, cent_y]
 
-    # Warp card into 256x360 flattened image using perspective transform
-    warp = cv2.resize(_flattener(image, pts, w, h), (256, 360))
+    return card_info
+
+
+def refine_corners(card_info: PokerCardInfo, image, window: int) -> None:
+    """Refines corner points of the located poker card to sub-pixel accuracy
+    using the image around them. Needed when the card contour was found in
+    a reduced image, as its corners are off by a few pixels."""
+
+    criteria = (cv2.TERM_CRITERIA_EPS + cv2.TERM_CRITERIA_COUNT, 30, 0.05)
+    margin = window + 2
+
+    corners = np.float32(card_info.corners)
+    for corner in corners:
+        x, y = int(round(corner[0][0])), int(round(corner[0][1]))
+
+        # Only the neighbourhood of the corner is grayed, corners too close
+        # to the image border are left as they are
+        if x < margin or y < margin or x + margin >= image.shape[1] or y + margin >= image.shape[0]:
+            continue
+        gray = cv2.cvtColor(image[y - margin:y + margin + 1, x - margin:x + margin + 1], cv2.COLOR_BGR2GRAY)
+
+        local_corner = np.float32([[corner[0] - [x - margin, y - margin]]])
+        cv2.cornerSubPix(gray, local_corner, (window, window), (-1, -1), criteria)
+        corner[0] = local_corner[0][0] + [x - margin, y - margin]
+
+    card_info.corners = corners
 
-    # Grab corner of warped card image and do a 4x zoom
-    corner = warp[0:CORNER_HEIGHT, 0:CORNER_WIDTH]
+
+def isolate_rank_and_suit(card_info: PokerCardInfo, image) -> None:
+    """Isolates rank and suit images from the located poker card."""
+
+    pts = card_info.corners
+    w, h = card_info.width, card_info.height
+
+    # Warp only the corner of the card, as if it was flattened to 256x360,
+    # and do a 4x zoom
+    corner = _corner_flattener(image, pts, w, h)
     corner_zoom = cv2.resize(corner, (0, 0), fx=4, fy=4)
 
     # Sample known white pixel intensity to determine good threshold level
@@ -209,8 +354,6 @@ def preprocess_card(contour, image) -> PokerCardInfo:
         suit_sized = cv2.resize(suit_roi, (SUIT_WIDTH, SUIT_HEIGHT), 0, 0)
         card_info.suit_img = suit_sized
 
-    return card_info
-
 
 def match_card(card, train_ranks, train_suits):
     """Finds best rank and suit matches for the poker card. Differences
@@ -263,6 +406,65 @@ def match_card(card, train_ranks, train_suits):
     return best_rank_match_name, best_suit_match_name, best_rank_match_diff, best_suit_match_diff
 
 
+def match_cards(cards, templates: TrainTemplates) -> list:
+    """Batched version of match_card. Differences the rank and suit images of all
+    poker cards with all stacked train images at once and returns the same
+    (rank, suit, rank diff, suit diff) tuple as match_card for every card."""
+
+    results = [(CardRank.unknown, CardSuit.unknown, 10000, 10000)] * len(cards)
+
+    # Cards without rank or suit image are left as unknown, same as in match_card
+    matched = [i for i in range(len(cards)) if len(cards[i].rank_img) != 0 and len(cards[i].suit_img) != 0]
+    if len(matched) == 0 or len(templates.ranks) == 0 or len(templates.suits) == 0:
+        return results
+
+    rank_imgs = _stack_images([cards[i].rank_img for i in matched], templates.packed)
+    suit_imgs = _stack_images([cards[i].suit_img for i in matched], templates.packed)
+    rank_diffs = _template_diffs(rank_imgs, templates.rank_imgs, templates.packed)
+    suit_diffs = _template_diffs(suit_imgs, templates.suit_imgs, templates.packed)
+
+    best_ranks = np.argmin(rank_diffs, axis=1)
+    best_suits = np.argmin(suit_diffs, axis=1)
+
+    for row, i in enumerate(matched):
+        rank_diff = min(int(rank_diffs[row, best_ranks[row]]), 10000)
+        suit_diff = min(int(suit_diffs[row, best_suits[row]]), 10000)
+
+        rank_name = templates.ranks[best_ranks[row]] if rank_diff < RANK_DIFF_MAX else CardRank.unknown
+        suit_name = templates.suits[best_suits[row]] if suit_diff < SUIT_DIFF_MAX else CardSuit.unknown
+        results[i] = (rank_name, suit_name, rank_diff, suit_diff)
+
+    return results
+
+
+def _stack_images(images, packed: bool) -> np.ndarray:
+    """Flattens equally sized images into rows of a single array."""
+
+    if len(images) == 0:
+        return np.empty((0, 0), dtype=np.uint8)
+
+    stacked = np.stack([np.asarray(img, dtype=np.uint8).ravel() for img in images])
+    if packed:
+        stacked = np.packbits(stacked > 127, axis=1)
+    return stacked
+
+
+def _template_diffs(imgs: np.ndarray, templates: np.ndarray, packed: bool) -> np.ndarray:
+    """Returns matrix of differences between every image (rows) and every
+    template (columns), in the same units as match_card."""
+
+    # Score all images against one template per call. Materializing every
+    # image/template pair at once allocates megabytes per frame and is slower.
+    diffs = np.empty((len(imgs), len(templates)), dtype=np.int64)
+    for j in range(len(templates)):
+        if packed:
+            diffs[:, j] = _POPCOUNT[np.bitwise_xor(imgs, templates[j])].sum(axis=1)
+        else:
+            diff = cv2.absdiff(imgs, np.broadcast_to(templates[j], imgs.shape).copy())
+            diffs[:, j] = cv2.reduce(diff, 1, cv2.REDUCE_SUM, dtype=cv2.CV_32S)[:, 0] // 255
+    return diffs
+
+
 def draw_results(image, card):
     """Draw the card name and contour on the camera image."""
 
@@ -282,9 +484,10 @@ def draw_results(image, card):
     return image
 
 
-def _flattener(image, pts, w, h):
-    """Flattens an image of a card into a top-down 200x300 perspective.
-    Returns the flattened, re-sized, grayed image.
+def _corner_flattener(image, pts, w, h):
+    """Flattens corner of a card into a top-down perspective. The transform
+    flattens the card to 200x300 and resizes it to 256x360 at once, and only
+    the corner pixels are computed. Returns the grayed corner image.
     See www.pyimagesearch.com/2014/08/25/4-point-opencv-getperspective-transform-example/"""
     temp_rect = np.zeros((4, 2), dtype="float32")
 
@@ -342,10 +545,18 @@ def _flattener(image, pts, w, h):
     max_height = 300
 
     # Create destination array, calculate perspective transform matrix,
-    # and warp card image
+    # follow it with the resize to 256x360, and warp corner of card image
     dst = np.array([[0, 0], [max_width - 1, 0], [max_width - 1, max_height - 1], [0, max_height - 1]], np.float32)
     m = cv2.getPerspectiveTransform(temp_rect, dst)
-    warp = cv2.warpPerspective(image, m, (max_width, max_height))
+    m = _resize_matrix(256 / max_width, 360 / max_height) @ m
+    warp = cv2.warpPerspective(image, m, (CORNER_WIDTH, CORNER_HEIGHT))
     warp = cv2.cvtColor(warp, cv2.COLOR_BGR2GRAY)
 
     return warp
+
+
+def _resize_matrix(fx: float, fy: float) -> np.ndarray:
+    """Returns transform matrix equal to cv2.resize with fx and fy scale,
+    which aligns pixel centers, not pixel corners."""
+
+    return np.array([[fx, 0, (fx - 1) / 2], [0, fy, (fy - 1) / 2], [0, 0, 1]])
@@ -0,0 +1,71 @@
+import argparse
+
+import cv2
+import numpy as np
+
+from classes.card_detector.poker_card_info import PokerCardInfo
+from logic.benchmark_functions import time_function
+from logic.card_detector import card_detection, card_detection_functions
+
+
+def parse_arguments():
+    # construct argument parser and parse arguments
+    ap = argparse.ArgumentParser()
+    ap.add_argument("-s", "--samples", required=False, help="path to sample images",
+                    default=card_detection.SAMPLE_IMAGES_PATH)
+    ap.add_argument("-c", "--cards", required=False, type=int, help="number of cards per frame", default=10)
+    ap.add_argument("-r", "--repeats", required=False, type=int, help="number of timed frames", default=200)
+    return vars(ap.parse_args())
+
+
+def _create_cards(train_ranks, train_suits, count: int, rng: np.random.RandomState) -> list:
+    """Creates poker cards with noisy, slightly shifted copies of train images."""
+
+    cards = []
+    for _ in range(count):
+        card = PokerCardInfo()
+        card.rank_img = _distort(train_ranks[rng.randint(len(train_ranks))].img, rng)
+        card.suit_img = _distort(train_suits[rng.randint(len(train_suits))].img, rng)
+        cards.append(card)
+    return cards
+
+
+def _distort(img, rng: np.random.RandomState):
+    shift = np.float32([[1, 0, rng.randint(-2, 3)], [0, 1, rng.randint(-2, 3)]])
+    img = cv2.warpAffine(img, shift, (img.shape[1], img.shape[0]))
+    noise = rng.randint(0, 40, img.shape).astype(np.uint8)
+    return cv2.add(img, noise)
+
+
+def main():
+    args = parse_arguments()
+
+    train_ranks = card_detection_functions.load_ranks(args["samples"])
+    train_suits = card_detection_functions.load_suits(args["samples"])
+    templates = card_detection_functions.stack_templates(train_ranks, train_suits)
+    packed_templates = card_detection_functions.stack_templates(train_ranks, train_suits, packed=True)
+
+    cards = _create_cards(train_ranks, train_suits, args["cards"], np.random.RandomState(0))
+
+    def loop():
+        return [card_detection_functions.match_card(card, train_ranks, train_suits) for card in cards]
+
+    def batched():
+        return card_detection_functions.match_cards(cards, templates)
+
+    def packed():
+        return card_detection_functions.match_cards(cards, packed_templates)
+
+    expected = loop()
+    print("Batched results equal to loop: {}".format(batched() == expected))
+    print("Packed results with equal identity: {}/{}".format(
+        sum(1 for a, b in zip(packed(), expected) if a[:2] == b[:2]), len(cards)))
+
+    loop_time = time_function(loop, args["repeats"])
+    for name, function in (("loop", loop), ("batched", batched), ("packed", packed)):
+        frame_time = time_function(function, args["repeats"])
+        print("{:>8}: {:8.3f} ms per frame, {:6.2f}x".format(name, frame_time * 1000, loop_time / frame_time))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,24 @@
+import argparse
+
+from logic.card_detector import card_detection, card_detection_functions
+
+
+def parse_arguments():
+    # construct argument parser and parse arguments
+    ap = argparse.ArgumentParser()
+    ap.add_argument("-s", "--samples", required=False, help="path to rank and suit images",
+                    default=card_detection.SAMPLE_IMAGES_PATH)
+    ap.add_argument("-o", "--output", required=False, help="path to template bundle",
+                    default=card_detection.DEFAULT_TEMPLATES_PATH)
+    return vars(ap.parse_args())
+
+
+def main():
+    args = parse_arguments()
+
+    card_detection_functions.compile_template_bundle(args["samples"], args["output"])
+    print("Templates compiled to: {}".format(args["output"]))
+
+
+if __name__ == "__main__":
+    main()
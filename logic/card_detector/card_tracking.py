@@ -0,0 +1,55 @@
+from typing import List, Optional
+
+import numpy as np
+
+from classes.card_detector.poker_card_info import PokerCardInfo
+from enums.card_rank_enum import CardRank
+from enums.card_suit_enum import CardSuit
+
+
+class CardTracker:
+    """Remembers cards identified in the previous frame of a video, so cards
+    which did not move can reuse their rank and suit instead of being
+    warped and matched again."""
+
+    def __init__(self, tolerance: float = 4.0, recheck_interval: int = 30):
+        self.tolerance = tolerance  # Maximum movement of center and corners in pixels
+        self.recheck_interval = recheck_interval  # Every that many frames all cards are classified again
+        self.hits = 0  # Number of cards which reused previous rank and suit
+        self.misses = 0  # Number of cards which had to be classified
+        self._frame = 0
+        self._cards: List[PokerCardInfo] = []
+
+    def find(self, card: PokerCardInfo) -> Optional[PokerCardInfo]:
+        """Returns card from the previous frame with the same geometry as located
+        card, or None if card has to be classified."""
+
+        if self._frame % self.recheck_interval != 0:
+            for previous in self._cards:
+                if self._is_same_place(card, previous):
+                    self.hits += 1
+                    return previous
+
+        self.misses += 1
+        return None
+
+    def update(self, cards: List[PokerCardInfo]) -> None:
+        """Stores cards of the current frame. Cards which were not recognized are
+        left out, so they are classified again in the next frame."""
+
+        self._cards = [card for card in cards
+                       if card.best_rank_match != CardRank.unknown and card.best_suit_match != CardSuit.unknown]
+        self._frame += 1
+
+    def _is_same_place(self, card: PokerCardInfo, previous: PokerCardInfo) -> bool:
+        if len(card.corners) != len(previous.corners):
+            return False
+
+        if np.hypot(card.center[0] - previous.center[0], card.center[1] - previous.center[1]) > self.tolerance:
+            return False
+
+        # Corners may come in different order, so each corner is compared with the closest previous one
+        corners = np.reshape(card.corners, (-1, 1, 2))
+        previous_corners = np.reshape(previous.corners, (1, -1, 2))
+        distances = np.hypot(*np.moveaxis(corners - previous_corners, -1, 0))
+        return bool(np.all(np.min(distances, axis=1) <= self.tolerance))
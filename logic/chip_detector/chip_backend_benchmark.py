@@ -0,0 +1,52 @@
+import argparse
+import time
+
+import numpy as np
+from sklearn.model_selection import train_test_split
+
+from logic.benchmark_functions import load_chip_rois, time_function
+from logic.chip_detector import chip_color_table, chip_detection
+
+
+def parse_arguments():
+    # construct argument parser and parse arguments
+    ap = argparse.ArgumentParser()
+    ap.add_argument("-s", "--samples", required=False, help="path to sample images", default="sample_images")
+    ap.add_argument("-r", "--repeats", required=False, type=int, help="number of timed runs", default=20)
+    ap.add_argument("--seed", required=False, type=int, help="seed of train/test split and classifier",
+                    default=0)
+    return vars(ap.parse_args())
+
+
+def main():
+    args = parse_arguments()
+
+    files, labels, _ = chip_detection._locate_sample_images(args["samples"])
+    if not files:
+        raise FileNotFoundError
+
+    # same hold-out split for both backends
+    train_files, test_files, train_labels, test_labels = train_test_split(files, labels, test_size=.2,
+                                                                          random_state=args["seed"])
+    test_rois = load_chip_rois(test_files)
+
+    start_time = time.perf_counter()
+    feature = chip_detection.CHIP_FEATURE
+    input_data = [chip_detection._calc_hist_from_file(file, feature) for file in train_files]
+    mlp, _ = chip_detection._train_classifier(input_data, train_labels, feature=feature, random_state=args["seed"])
+    mlp_train_time = time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+    table = chip_color_table.train_color_table(train_files, train_labels, chip_detection._circle_mask)
+    table_train_time = time.perf_counter() - start_time
+
+    print("{:>12} {:>9} {:>10} {:>10}".format("backend", "accuracy", "train s", "ms/chip"))
+    for name, clf, train_time in (("mlp", mlp, mlp_train_time), ("color-table", table, table_train_time)):
+        predictions = chip_detection._predict_chip_batch(clf, test_rois)
+        accuracy = np.mean([chip.name == label for chip, label in zip(predictions, test_labels)])
+        chip_time = time_function(lambda: chip_detection._predict_chip_batch(clf, test_rois[:10]), args["repeats"]) / 10
+        print("{:>12} {:>8.1f}% {:>10.2f} {:>10.3f}".format(name, accuracy * 100, train_time, chip_time * 1000))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+import argparse
+
+import cv2
+import numpy as np
+
+from classes.frame_context import FrameContext
+from logic.benchmark_functions import time_function
+from logic.chip_detector import chip_detection
+
+
+def parse_arguments():
+    # construct argument parser and parse arguments
+    ap = argparse.ArgumentParser()
+    ap.add_argument("-i", "--images", required=False, nargs="+", help="paths to sample frames",
+                    default=["chips_input.jpg"])
+    ap.add_argument("-s", "--scales", required=False, nargs="+", type=float, help="circle scales to compare",
+                    default=[0.5, 0.35, 0.25])
+    ap.add_argument("-r", "--repeats", required=False, type=int, help="number of timed runs per frame", default=5)
+    return vars(ap.parse_args())
+
+
+def _count_found(circles, reference) -> int:
+    """Counts reference circles with a circle closer than half the reference radius."""
+
+    if circles is None or reference is None:
+        return 0
+
+    centers = circles[0][:, :2]
+    found = 0
+    for (x, y, r) in reference[0]:
+        if np.min(np.hypot(centers[:, 0] - x, centers[:, 1] - y)) < r / 2:
+            found += 1
+    return found
+
+
+def main():
+    args = parse_arguments()
+
+    frames = []
+    for filename in args["images"]:
+        img = cv2.imread(filename)
+        if img is None:
+            raise FileNotFoundError(filename)
+        frames.append(FrameContext(img).clahe_gray)
+
+    # circles found in full resolution are the reference for recall
+    references = [chip_detection._detect_circles(gray) for gray in frames]
+    reference_count = sum(0 if circles is None else len(circles[0]) for circles in references)
+
+    full_time = sum(time_function(lambda: chip_detection._detect_circles(gray), args["repeats"]) for gray in frames)
+    print("  full: {:8.2f} ms per frame, {} circles".format(full_time / len(frames) * 1000, reference_count))
+
+    for scale in args["scales"]:
+        frame_time = 0
+        found = 0
+        count = 0
+        for gray, reference in zip(frames, references):
+            frame_time += time_function(lambda: chip_detection._detect_circles(gray, scale), args["repeats"])
+            circles = chip_detection._detect_circles(gray, scale)
+            found += _count_found(circles, reference)
+            count += 0 if circles is None else len(circles[0])
+
+        print("{:>6}: {:8.2f} ms per frame, {:5.2f}x, {} circles, recall {}/{}".format(
+            scale, frame_time / len(frames) * 1000, full_time / frame_time, count, found, reference_count))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+import argparse
+
+from logic.benchmark_functions import load_chip_rois, repeat_files, time_function
+from logic.chip_detector import chip_classifier_export, chip_detection
+
+
+def parse_arguments():
+    # construct argument parser and parse arguments
+    ap = argparse.ArgumentParser()
+    ap.add_argument("-c", "--classifier", required=False, help="path to classifier",
+                    default="chip_classifier.joblib")
+    ap.add_argument("-s", "--samples", required=False, help="path to sample images", default="sample_images")
+    ap.add_argument("-e", "--exported", required=False, help="path to the same classifier exported to .npz")
+    ap.add_argument("-r", "--repeats", required=False, type=int, help="number of timed frames", default=20)
+    return vars(ap.parse_args())
+
+
+def main():
+    args = parse_arguments()
+
+    clf = chip_detection._load_classifier(args["classifier"])
+    if clf is None:
+        raise FileNotFoundError
+
+    exported = None
+    if args["exported"] is not None:
+        exported = chip_classifier_export.load_exported_classifier(args["exported"])
+        if exported is None:
+            raise FileNotFoundError
+
+    files, _, _ = chip_detection._locate_sample_images(args["samples"])
+    for count in (1, 10, 100):
+        rois = load_chip_rois(repeat_files(files, count))
+
+        def per_chip():
+            return [chip_detection._predict_chip(clf, roi) for roi in rois]
+
+        def batched():
+            return chip_detection._predict_chip_batch(clf, rois)
+
+        if per_chip() != batched():
+            print("Batched predictions differ for {} chips".format(count))
+
+        per_chip_time = time_function(per_chip, args["repeats"]) / count
+        batched_time = time_function(batched, args["repeats"]) / count
+        print("{:>3} chips: per chip {:7.3f} ms, batched {:7.3f} ms per chip, {:5.2f}x".format(
+            count, per_chip_time * 1000, batched_time * 1000, per_chip_time / batched_time))
+
+        if exported is not None:
+            def numpy_batched():
+                return chip_detection._predict_chip_batch(exported, rois)
+
+            agreement = sum(1 for a, b in zip(numpy_batched(), batched()) if a == b)
+            numpy_time = time_function(numpy_batched, args["repeats"]) / count
+            print("{:>3} chips: exported {:7.3f} ms per chip, {:5.2f}x, {}/{} equal predictions".format(
+                count, numpy_time * 1000, per_chip_time / numpy_time, agreement, count))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+import json
+import os
+from typing import Optional
+
+import numpy as np
+
+CLASSIFIER_EXPORT_VERSION = 1
+
+# Storage types of exported weights, weights are always evaluated as float32
+QUANTIZATIONS = ("float32", "float16", "int8")
+
+_ACTIVATIONS = {
+    "identity": lambda x: x,
+    "relu": lambda x: np.maximum(x, 0, out=x),
+    "tanh": lambda x: np.tanh(x, out=x),
+    "logistic": lambda x: np.divide(1.0, 1.0 + np.exp(-x, out=x), out=x),
+}
+
+
+class NumpyChipClassifier:
+    """Forward pass of an exported MLPClassifier in plain NumPy. Offers predict
+    like the scikit-learn classifier, without importing scikit-learn and
+    without its input validation on every call."""
+
+    def __init__(self, coefs: list, intercepts: list, activation: str, out_activation: str, classes: np.ndarray,
+                 chip_feature: dict):
+        self.coefs_ = coefs  # Weight matrices of all layers (float32)
+        self.intercepts_ = intercepts  # Bias vectors of all layers (float32)
+        self.activation = activation  # Activation of hidden layers
+        self.out_activation_ = out_activation  # Activation of output layer, softmax or logistic
+        self.classes_ = classes  # Class labels (chip names)
+        self.chip_feature_ = chip_feature  # Feature the classifier was trained with
+
+    def predict(self, features) -> np.ndarray:
+        x = np.asarray(features, dtype=np.float32)
+        if x.ndim == 1:
+            x = x[np.newaxis]
+
+        hidden = _ACTIVATIONS[self.activation]
+        for coef, intercept in zip(self.coefs_[:-1], self.intercepts_[:-1]):
+            x = hidden(x @ coef + intercept)
+        x = x @ self.coefs_[-1] + self.intercepts_[-1]
+
+        # output activations are monotonic, so classes are chosen on raw outputs
+        if self.out_activation_ == "logistic" and x.shape[1] == 1:
+            return self.classes_[(x[:, 0] > 0).astype(np.intp)]
+        return self.classes_[np.argmax(x, axis=1)]
+
+
+def export_classifier(clf, filename: str, quantization: str = "float32"):
+    """Writes weights, biases, activations, class labels and chip feature of a
+    trained MLPClassifier to an .npz file. Weights can be stored as float16,
+    or as int8 with one scale per output unit."""
+
+    if quantization not in QUANTIZATIONS:
+        raise ValueError("Unknown quantization: {}".format(quantization))
+
+    arrays = {}
+    for i, (coef, intercept) in enumerate(zip(clf.coefs_, clf.intercepts_)):
+        if quantization == "int8":
+            scale = np.max(np.abs(coef), axis=0) / 127
+            scale[scale == 0] = 1
+            arrays["coef_{}".format(i)] = np.round(coef / scale).astype(np.int8)
+            arrays["scale_{}".format(i)] = scale.astype(np.float32)
+        else:
+            arrays["coef_{}".format(i)] = coef.astype(quantization)
+        arrays["intercept_{}".format(i)] = intercept.astype(np.float32)
+
+    np.savez(filename, version=CLASSIFIER_EXPORT_VERSION, layers=len(clf.coefs_), activation=clf.activation,
+             out_activation=clf.out_activation_, classes=np.asarray(clf.classes_).astype(str),
+             feature=json.dumps(getattr(clf, "chip_feature_", {"version": 1})), **arrays)
+
+
+def load_exported_classifier(filename: str) -> Optional[NumpyChipClassifier]:
+    """Loads classifier written by export_classifier. Returns None if the file
+    does not exist or was exported with another version."""
+
+    if not os.path.isfile(filename):
+        return None
+
+    with np.load(filename) as data:
+        if int(data["version"]) != CLASSIFIER_EXPORT_VERSION:
+            return None
+
+        coefs = []
+        intercepts = []
+        for i in range(int(data["layers"])):
+            coef = data["coef_{}".format(i)].astype(np.float32)
+            if "scale_{}".format(i) in data:
+                coef *= data["scale_{}".format(i)]
+            coefs.append(coef)
+            intercepts.append(data["intercept_{}".format(i)])
+
+        return NumpyChipClassifier(coefs, intercepts, str(data["activation"]), str(data["out_activation"]),
+                                   data["classes"], json.loads(str(data["feature"])))
@@ -0,0 +1,31 @@
+import argparse
+import os
+
+from logic.chip_detector import chip_classifier_export, chip_detection
+
+
+def parse_arguments():
+    # construct argument parser and parse arguments
+    ap = argparse.ArgumentParser()
+    ap.add_argument("-c", "--classifier", required=False, help="path to classifier",
+                    default="chip_classifier.joblib")
+    ap.add_argument("-o", "--output", required=False, help="path to exported classifier",
+                    default="chip_classifier.npz")
+    ap.add_argument("-q", "--quantization", required=False, help="storage type of weights",
+                    choices=chip_classifier_export.QUANTIZATIONS, default="float32")
+    return vars(ap.parse_args())
+
+
+def main():
+    args = parse_arguments()
+
+    clf = chip_detection._load_classifier(args["classifier"])
+    if clf is None:
+        raise FileNotFoundError
+
+    chip_classifier_export.export_classifier(clf, args["output"], args["quantization"])
+    print("Classifier exported to: {} ({:.1f} KiB)".format(args["output"], os.path.getsize(args["output"]) / 1024))
+
+
+if __name__ == "__main__":
+    main()
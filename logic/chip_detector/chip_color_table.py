@@ -0,0 +1,115 @@
+import os
+from typing import List, Optional
+
+import cv2
+import numpy as np
+
+from logic.npz_files import save_npz
+
+COLOR_TABLE_VERSION = 1
+
+# Number of quantization steps of hue, saturation and value
+COLOR_TABLE_BINS = (30, 16, 16)
+
+# Every that many pixel in both directions votes, colors of chips are uniform enough
+COLOR_TABLE_VOTE_STEP = 2
+
+# Share of a color cell's normalized frequency a chip needs to own the cell,
+# cells shared by several chips (like the table felt) do not vote
+COLOR_TABLE_DOMINANCE = 0.6
+
+
+class ColorTableChipClassifier:
+    """Classifies chips by their colors. Every quantized HSV color is mapped to
+    the chip it is typical for, a chip region of interest is classified as the
+    chip most of its pixels vote for. Regions without votes are unknown."""
+
+    def __init__(self, table: np.ndarray, bins: tuple, classes: np.ndarray):
+        self.table = table  # Index of chip class for every quantized color, -1 for colors which do not vote
+        self.bins = bins  # Number of quantization steps of hue, saturation and value
+        self.classes_ = classes  # Class labels (chip names)
+        self._channel_indices = tuple(indices.astype(np.uint16) for indices in _channel_indices(bins))
+        self._voters = {}
+
+    def predict_rois(self, rois, mask: np.ndarray) -> np.ndarray:
+        """Returns chip names of stacked, equally sized HSV regions of interest,
+        pixels selected by mask vote."""
+
+        rois = np.ascontiguousarray(rois)
+        pixels = np.take(rois.reshape(len(rois), -1, 3), self._voting_pixels(mask), axis=1)
+
+        # quantized color cell and its chip of every pixel
+        h, s, v = self._channel_indices
+        votes = self.table[h[pixels[..., 0]] + s[pixels[..., 1]] + v[pixels[..., 2]]]
+
+        # count votes of all regions with one bincount, the last column collects pixels which do not vote
+        classes = len(self.classes_)
+        votes = np.where(votes < 0, classes, votes) + (np.arange(len(rois)) * (classes + 1))[:, np.newaxis]
+        counts = np.bincount(votes.ravel(), minlength=len(rois) * (classes + 1)).reshape(len(rois), classes + 1)
+
+        labels = np.append(self.classes_, "unknown")
+        best = np.argmax(counts[:, :-1], axis=1)
+        best[counts[np.arange(len(rois)), best] == 0] = classes
+        return labels[best]
+
+    def _voting_pixels(self, mask: np.ndarray) -> np.ndarray:
+        # flat indices of voting pixels, computed once per mask
+        key = (mask.shape, hash(mask.tobytes()))
+        if key not in self._voters:
+            grid = np.zeros(mask.shape, dtype=bool)
+            grid[::COLOR_TABLE_VOTE_STEP, ::COLOR_TABLE_VOTE_STEP] = True
+            self._voters[key] = np.flatnonzero((mask > 0) & grid)
+        return self._voters[key]
+
+
+def train_color_table(files: List[str], labels: List[str], mask_of, bins: tuple = COLOR_TABLE_BINS,
+                      dominance: float = COLOR_TABLE_DOMINANCE) -> ColorTableChipClassifier:
+    """Counts quantized colors of sample images per chip and maps every color to
+    the chip it is most frequent for, relative to the other chips. mask_of
+    returns the mask of sample pixels for an image shape."""
+
+    classes = np.unique(labels)
+    cells = bins[0] * bins[1] * bins[2]
+    h, s, v = _channel_indices(bins)
+
+    counts = np.zeros((len(classes), cells), dtype=np.float64)
+    for file, label in zip(files, labels):
+        hsv_img = cv2.cvtColor(cv2.imread(file), cv2.COLOR_BGR2HSV)
+        pixels = hsv_img[mask_of(hsv_img.shape[:2]) > 0]
+        cell = h[pixels[:, 0]] + s[pixels[:, 1]] + v[pixels[:, 2]]
+        counts[np.searchsorted(classes, label)] += np.bincount(cell, minlength=cells)
+
+    # frequency of every color within samples of each chip, so chips with more samples do not dominate
+    frequencies = counts / np.maximum(counts.sum(axis=1, keepdims=True), 1)
+    total = frequencies.sum(axis=0)
+    best = np.argmax(frequencies, axis=0)
+    share = np.divide(frequencies[best, np.arange(cells)], total, out=np.zeros(cells), where=total > 0)
+
+    table = np.where(share >= dominance, best, -1).astype(np.int8)
+    return ColorTableChipClassifier(table, tuple(bins), classes)
+
+
+def save_color_table(clf: ColorTableChipClassifier, filename: str):
+    save_npz(filename, version=COLOR_TABLE_VERSION, table=clf.table, bins=np.array(clf.bins),
+             classes=np.asarray(clf.classes_).astype(str))
+
+
+def load_color_table(filename: str) -> Optional[ColorTableChipClassifier]:
+    """Loads color table saved by save_color_table. Returns None if the file does
+    not exist or was saved with another version."""
+
+    if not os.path.isfile(filename):
+        return None
+
+    with np.load(filename) as data:
+        if int(data["version"]) != COLOR_TABLE_VERSION:
+            return None
+        return ColorTableChipClassifier(data["table"], tuple(int(b) for b in data["bins"]), data["classes"])
+
+
+def _channel_indices(bins: tuple) -> tuple:
+    # offsets of every channel value in the flattened color table
+    h = (np.arange(256) * bins[0] // 180).clip(0, bins[0] - 1) * bins[1] * bins[2]
+    s = np.arange(256) * bins[1] // 256 * bins[2]
+    v = np.arange(256) * bins[2] // 256
+    return h.astype(np.intp), s.astype(np.intp), v.astype(np.intp)
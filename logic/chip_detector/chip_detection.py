@@ -1,27 +1,56 @@
 import glob
 import json
 import os
-from typing import Optional, List
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import List, Optional, Tuple
 
 import cv2
 import numpy as np
-from joblib import dump, load
-from sklearn.model_selection import train_test_split
-from sklearn.neural_network import MLPClassifier
 
+from classes.frame_context import FrameContext
 from enums.poker_chip_enum import PokerChip
+from logic.chip_detector import chip_classifier_export, chip_color_table
+from logic.chip_detector.chip_tracking import ChipTracker
 
-# noinspection PyTypeChecker
-_clf: MLPClassifier = None
+# MLPClassifier, or NumpyChipClassifier loaded from an exported .npz file
+_clf = None
 _enabled = True
+_circle_masks = {}
+
+# Offsets of the points tested against card contours, relative to circle radius
+_CIRCLE_POINT_OFFSETS = np.array([(0, 0), (1, 0), (-1, 0), (0, 1), (0, -1)])
+
+# Chip regions of interest are resized to this size before classification
+CHIP_ROI_SIZE = (128, 128)
 
 CHIP_MIN_DISTANCE = 100
 CHIP_MIN_RADIUS = 20
 CHIP_MAX_RADIUS = 120
 
+# Scale of the image in which circles are searched first, 1.0 searches the
+# full resolution image only. Circles found in the smaller image are refined
+# in small full resolution windows.
+CIRCLE_SCALE = 1.0
+COARSE_THRESHOLD = 0.5
+
+# Feature used by newly trained classifiers. Version 1 is the full 180x255
+# hue/saturation histogram, version 2 is a coarse hue/saturation histogram
+# with value histogram and saturation/value statistics. Classifiers store
+# the feature they were trained with, so older ones keep working.
+CHIP_FEATURE = {"version": 2, "hue-bins": 18, "saturation-bins": 8, "value-bins": 8}
+
+# Default paths of the classifiers of both backends
+CLASSIFIER_FILENAME = "chip_classifier.joblib"
+COLOR_TABLE_FILENAME = "chip_color_table.npz"
+
+# Features of sample images are cached in this file inside the sample images
+# directory, so retraining only processes new or changed images
+FEATURE_CACHE_FILENAME = "chip_features.npz"
+
 
 def _load_settings():
-    global CHIP_MIN_RADIUS, CHIP_MAX_RADIUS, CHIP_MIN_DISTANCE
+    global CHIP_MIN_RADIUS, CHIP_MAX_RADIUS, CHIP_MIN_DISTANCE, CHIP_FEATURE, CIRCLE_SCALE
 
     if os.path.isfile("config.json"):
         with open("config.json", "r") as file:
@@ -29,6 +58,8 @@ def _load_settings():
         CHIP_MIN_DISTANCE = settings["chip-min-distance"]
         CHIP_MIN_RADIUS = settings["chip-min-radius"]
         CHIP_MAX_RADIUS = settings["chip-max-radius"]
+        CHIP_FEATURE = settings.get("chip-feature", CHIP_FEATURE)
+        CIRCLE_SCALE = settings.get("circle-scale", CIRCLE_SCALE)
 
 
 _load_settings()
@@ -39,13 +70,48 @@ def disable():
     _enabled = False
 
 
-def setup(classifier_path: str = "chip_classifier.joblib"):
+def setup(classifier_path: str = None, backend: str = "mlp"):
+    """Loads chip classifier, trains it from sample images if it does not exist.
+    Backend "mlp" is the multi-layer perceptron, classifiers exported to .npz
+    are loaded without scikit-learn. Backend "color-table" classifies chips
+    with a quantized HSV color lookup table stored at classifier_path, which
+    has to be an .npz file. Every backend has its own default path."""
+
     global _clf
 
+    if backend == "color-table":
+        if classifier_path is None:
+            classifier_path = COLOR_TABLE_FILENAME
+        if not classifier_path.endswith(".npz"):
+            raise ValueError("Color table has to be an .npz file: {}".format(classifier_path))
+
+        _clf = chip_color_table.load_color_table(classifier_path)
+        if _clf is None:
+            files, labels, _ = _locate_sample_images("sample_images")
+            _clf = chip_color_table.train_color_table(files, labels, _circle_mask)
+            chip_color_table.save_color_table(_clf, classifier_path)
+        return
+
+    if backend != "mlp":
+        raise ValueError("Unknown chip classifier backend: {}".format(backend))
+
+    if classifier_path is None:
+        classifier_path = CLASSIFIER_FILENAME
+
+    if classifier_path.endswith(".npz"):
+        _clf = chip_classifier_export.load_exported_classifier(classifier_path)
+        if _clf is None:
+            input_data, output_data = _create_training_data_sets("sample_images")
+            clf, _ = _train_classifier(input_data, output_data, keys=_locate_sample_images("sample_images")[2])
+            chip_classifier_export.export_classifier(clf, classifier_path)
+            _clf = chip_classifier_export.load_exported_classifier(classifier_path)
+        return
+
     _clf = _load_classifier(classifier_path)
     if _clf is None:
         input_data, output_data = _create_training_data_sets("sample_images")
-        _clf, _ = _train_classifier(input_data, output_data, classifier_path)
+        _clf, _ = _train_classifier(input_data, output_data, classifier_path,
+                                    keys=_locate_sample_images("sample_images")[2])
 
 
 def generate_classifier(sample_images_path: str, output_filename: str):
@@ -57,69 +123,166 @@ def generate_classifier(sample_images_path: str, output_filename: str):
     if not input_data or not output_data:
         raise FileNotFoundError
 
-    _, _ = _train_classifier(input_data, output_data, output_filename)
+    _, _ = _train_classifier(input_data, output_data, output_filename,
+                             keys=_locate_sample_images(sample_images_path)[2])
 
 
-def detect_chips(img, dst=None, card_cnts: list = None) -> List[PokerChip]:
+def update_classifier(sample_images_path: str, output_filename: str, batch_size: int = 64, epochs: int = 10,
+                      random_state: int = None) -> int:
+    """Trains classifier with minibatches read from disk, so memory stays bounded
+    by batch_size instead of the number of samples. If output_filename already
+    holds a classifier, only samples it has not seen yet are folded into it,
+    mixed with as many random samples it was trained with. Returns the number
+    of new samples."""
+
+    if not os.path.isdir(sample_images_path):
+        raise FileNotFoundError
+
+    files, labels, keys = _locate_sample_images(sample_images_path)
+    if not files:
+        raise FileNotFoundError
+
+    clf = _load_classifier(output_filename)
+    rng = np.random.RandomState(random_state)
+
+    if clf is None:
+        from sklearn.neural_network import MLPClassifier
+
+        clf = MLPClassifier(solver="adam", random_state=random_state)
+        clf.chip_feature_ = dict(CHIP_FEATURE)
+        clf.chip_samples_ = set()
+        classes = np.unique(labels)
+        selected = list(range(len(files)))
+        new_count = len(files)
+    else:
+        if not hasattr(clf, "chip_samples_"):
+            clf.chip_samples_ = set()
+        classes = clf.classes_
+
+        # chip values unknown to the classifier can not be added incrementally
+        known = [i for i in range(len(files)) if labels[i] in classes]
+        new = [i for i in known if keys[i] not in clf.chip_samples_]
+        seen = [i for i in known if keys[i] in clf.chip_samples_]
+        if not new:
+            return 0
+
+        # samples the classifier was trained with keep it from forgetting them
+        replay = rng.choice(seen, min(len(new), len(seen)), replace=False).tolist() if seen else []
+        selected = new + replay
+        new_count = len(new)
+
+    feature = _get_feature(clf)
+    features = np.empty((batch_size, _feature_length(feature)), dtype=np.float32)
+    for _ in range(epochs):
+        order = rng.permutation(selected)
+        for start in range(0, len(order), batch_size):
+            batch = order[start:start + batch_size]
+            for row, i in enumerate(batch):
+                features[row] = _calc_hist_from_file(files[i], feature)
+            if clf.solver == "lbfgs":
+                clf = _adam_classifier(clf, features[:len(batch)], [labels[i] for i in batch], classes,
+                                       random_state)
+            clf.partial_fit(features[:len(batch)], [labels[i] for i in batch], classes=classes)
+
+    clf.chip_samples_ |= {keys[i] for i in selected}
+
+    from joblib import dump
+    dump(clf, output_filename)
+
+    return new_count
+
+
+def _adam_classifier(clf, input_data, output_data, classes, random_state: int = None):
+    """Returns classifier trained with adam which starts from the weights of clf.
+    Classifiers trained with lbfgs do not support partial_fit, so a new one with
+    the same layers is initialized by partial_fit on a batch and gets the weights
+    of clf afterwards."""
+
+    from sklearn.neural_network import MLPClassifier
+
+    adam_clf = MLPClassifier(solver="adam", hidden_layer_sizes=clf.hidden_layer_sizes, activation=clf.activation,
+                             alpha=clf.alpha, random_state=random_state)
+    adam_clf.partial_fit(input_data, output_data, classes=classes)
+
+    if [coef.shape for coef in adam_clf.coefs_] != [coef.shape for coef in clf.coefs_]:
+        raise ValueError("Classifier layers do not match its chip feature, train a new classifier")
+    # weights are copied into the arrays the optimizer of adam_clf updates
+    for coef, old_coef in zip(adam_clf.coefs_, clf.coefs_):
+        coef[...] = old_coef
+    for intercept, old_intercept in zip(adam_clf.intercepts_, clf.intercepts_):
+        intercept[...] = old_intercept
+    adam_clf.chip_feature_ = _get_feature(clf)
+    adam_clf.chip_samples_ = getattr(clf, "chip_samples_", set())
+    return adam_clf
+
+
+def detect_chips(img, dst=None, card_cnts: list = None, context: FrameContext = None,
+                 tracker: ChipTracker = None) -> List[PokerChip]:
+    return [chip for chip, _ in detect_chip_positions(img, dst, card_cnts, context, tracker=tracker)]
+
+
+def detect_chip_positions(img, dst=None, card_cnts: list = None, context: FrameContext = None,
+                          scale: float = None, tracker: ChipTracker = None) -> List[Tuple[PokerChip, Tuple[int, int]]]:
     global _clf, _enabled
 
     if not _enabled:
         return []
 
-    # convert image to grayscale
-    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-    hsv_img = cv2.cvtColor(img, cv2.COLOR_BGR2HSV)
+    if scale is None:
+        scale = CIRCLE_SCALE
 
-    # improve contrast accounting for differences in lighting conditions:
-    # create a CLAHE object to apply contrast limiting adaptive histogram equalization
-    clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
-    gray = clahe.apply(gray)
+    # grayscale and HSV images may be shared with other detectors
+    if context is None:
+        context = FrameContext(img)
 
-    circles = _detect_circles(gray)
+    # grayscale image with improved contrast accounting for differences in lighting conditions
+    gray = context.clahe_gray
+    hsv_img = context.hsv
+
+    circles = _detect_circles(gray, scale)
 
     if circles is None:
+        if tracker is not None:
+            tracker.update(np.empty((0, 3)), [])
         return []
 
     if card_cnts is not None:
         circles = _remove_circles_in_contour(circles, card_cnts)
 
-    poker_chips = _predict_chips(hsv_img, _clf, circles, dst=dst)
+    poker_chips = _predict_chips(hsv_img, _clf, circles, dst=dst, tracker=tracker)
 
     return poker_chips
 
 
 def _remove_circles_in_contour(circles: list, cnts: list):
-    circles_to_remove = []
-    for i in range(len(circles[0])):
-        x, y, d = circles[0][i]
-        for cnt in cnts:
-            points = [(x, y), (x + d, y), (x - d, y), (x, y + d), (x, y - d)]
-            circle_in_cnts = False
-
-            for point in points:
-                dist = cv2.pointPolygonTest(cnt, point, False)
-                if dist >= 0:
-                    circle_in_cnts = True
-                    break
-            if circle_in_cnts:
-                circles_to_remove.append(i)
-                break
-    if len(circles_to_remove) == 0:
+    if len(cnts) == 0:
         return circles
 
-    circles_temp = np.delete(circles[0], circles_to_remove, axis=0)
-    circles_result = np.empty((1,) + circles_temp.shape)
-    circles_result[0] = circles_temp
-    return circles_result
+    # rasterize all contours into one mask, which only covers their bounding box
+    points = np.concatenate([cnt.reshape(-1, 2) for cnt in cnts])
+    left, top = np.min(points, axis=0)
+    width, height = np.max(points, axis=0) - (left, top) + 1
+    mask = np.zeros((height, width), dtype=np.uint8)
+    cv2.drawContours(mask, cnts, -1, 1, -1, offset=(-int(left), -int(top)))
+
+    # center and four outermost points of every circle, rounded to pixels of the mask
+    x, y, d = (circles[0][:, i:i + 1] for i in range(3))
+    points_x = np.round(x + d * _CIRCLE_POINT_OFFSETS[:, 0]).astype(np.intp) - left
+    points_y = np.round(y + d * _CIRCLE_POINT_OFFSETS[:, 1]).astype(np.intp) - top
+
+    # single lookup of all points, points outside of the mask are outside of all contours
+    valid = (points_x >= 0) & (points_x < width) & (points_y >= 0) & (points_y < height)
+    inside = np.zeros(points_x.shape, dtype=bool)
+    inside[valid] = mask[points_y[valid], points_x[valid]] > 0
+
+    return circles[:, ~inside.any(axis=1)]
 
 
 def _calc_histogram(hsv_img):
     # hsv_img = cv2.resize(hsv_img, (128, 128))
 
-    # create mask
-    m = np.zeros(hsv_img.shape[:2], dtype="uint8")
-    (w, h) = (int(hsv_img.shape[1] / 2), int(hsv_img.shape[0] / 2))
-    m = cv2.circle(m, (w, h), 60, 255, -1)
+    # mask
+    m = _circle_mask(hsv_img.shape[:2])
 
     # calcHist expects a list of images, color channels, mask, bins, ranges
     h = cv2.calcHist([hsv_img], [0, 1], m, [180, 255], [0, 180, 0, 255])
@@ -128,47 +291,180 @@ def _calc_histogram(hsv_img):
     return cv2.normalize(h, h).flatten()
 
 
-def _calc_hist_from_file(file):
+def _calc_compact_feature(hsv_img, hue_bins: int, saturation_bins: int, value_bins: int):
+    # mask, same as in _calc_histogram
+    m = _circle_mask(hsv_img.shape[:2])
+
+    # coarse hue/saturation histogram and value histogram
+    hs = cv2.calcHist([hsv_img], [0, 1], m, [hue_bins, saturation_bins], [0, 180, 0, 256])
+    v = cv2.calcHist([hsv_img], [2], m, [value_bins], [0, 256])
+
+    # mean and standard deviation of saturation and value
+    mean, std = cv2.meanStdDev(hsv_img, mask=m)
+    stats = np.concatenate((mean[1:], std[1:])).flatten() / 255
+
+    return np.concatenate((cv2.normalize(hs, hs).flatten(), cv2.normalize(v, v).flatten(),
+                           stats.astype(np.float32)))
+
+
+def _calc_feature(hsv_img, feature: dict):
+    if feature["version"] == 1:
+        return _calc_histogram(hsv_img)
+    if feature["version"] == 2:
+        return _calc_compact_feature(hsv_img, feature["hue-bins"], feature["saturation-bins"], feature["value-bins"])
+    raise ValueError("Unknown chip feature version: {}".format(feature["version"]))
+
+
+def _circle_mask(shape: Tuple[int, int]) -> np.ndarray:
+    # mask of the circle used by the features, created once per image size
+    if shape not in _circle_masks:
+        m = np.zeros(shape, dtype="uint8")
+        (w, h) = (int(shape[1] / 2), int(shape[0] / 2))
+        _circle_masks[shape] = cv2.circle(m, (w, h), 60, 255, -1)
+    return _circle_masks[shape]
+
+
+def _feature_length(feature: dict) -> int:
+    if feature["version"] == 1:
+        return 180 * 255
+    return feature["hue-bins"] * feature["saturation-bins"] + feature["value-bins"] + 4
+
+
+def _calc_features(rois, feature: dict) -> np.ndarray:
+    """Calculates feature matrix with one row per HSV region of interest,
+    rows are written into a single preallocated array."""
+
+    features = np.empty((len(rois), _feature_length(feature)), dtype=np.float32)
+    for i, roi in enumerate(rois):
+        features[i] = _calc_feature(roi, feature)
+    return features
+
+
+def _get_feature(clf) -> dict:
+    # classifiers saved before features were versioned use the full histogram
+    return getattr(clf, "chip_feature_", {"version": 1})
+
+
+def _calc_hist_from_file(file, feature: dict):
     img = cv2.imread(file)
     img = cv2.cvtColor(img, cv2.COLOR_BGR2HSV)
-    return _calc_histogram(img)
+    return _calc_feature(img, feature)
 
 
-def _create_training_data_sets(sample_images_path: str):
-    # locate sample image files
-    sample_images = []
-    for enum in PokerChip:
-        sample_images.append(
-            (enum, glob.glob("{}/{}/*".format(sample_images_path, enum.name)))
-        )
+def _create_training_data_sets(sample_images_path: str, feature: dict = None, workers: int = None,
+                               use_cache: bool = True):
+    if feature is None:
+        feature = CHIP_FEATURE
+
+    files, output_data, keys = _locate_sample_images(sample_images_path)
+    cache_filename = os.path.join(sample_images_path, FEATURE_CACHE_FILENAME)
+    cache = _load_feature_cache(cache_filename, feature) if use_cache else {}
+
+    # calculate features of new and changed images only
+    missing = [i for i, key in enumerate(keys) if key not in cache]
+    for i, hist in zip(missing, _calc_hists_from_files([files[i] for i in missing], feature, workers)):
+        cache[keys[i]] = hist
 
     # define training data and labels
-    input_data = []
-    output_data = []
+    input_data = [cache[key] for key in keys]
+
+    if use_cache and (missing or len(cache) != len(keys)):
+        _save_feature_cache(cache_filename, feature, keys, input_data)
 
-    for enum, glob_elem in sample_images:
-        for i in glob_elem:
-            input_data.append(_calc_hist_from_file(i))
-            output_data.append(enum.name)
     return input_data, output_data
 
 
-def _load_classifier(filename: str) -> Optional[MLPClassifier]:
+def _locate_sample_images(sample_images_path: str) -> Tuple[List[str], List[str], List[tuple]]:
+    # locate sample image files
+    files = []
+    labels = []
+    for enum in PokerChip:
+        for file in sorted(glob.glob("{}/{}/*".format(sample_images_path, enum.name))):
+            files.append(file)
+            labels.append(enum.name)
+
+    # file path relative to samples directory, size and modification time identify a sample
+    keys = [(os.path.relpath(file, sample_images_path),) + _file_stamp(file) for file in files]
+    return files, labels, keys
+
+
+def _file_stamp(file: str) -> Tuple[int, int]:
+    stat = os.stat(file)
+    return stat.st_size, stat.st_mtime_ns
+
+
+def _calc_hists_from_files(files: List[str], feature: dict, workers: int = None) -> list:
+    # a handful of images is faster without starting worker processes
+    if workers == 1 or len(files) < 32:
+        return [_calc_hist_from_file(file, feature) for file in files]
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(partial(_calc_hist_from_file, feature=feature), files, chunksize=16))
+
+
+def _load_feature_cache(filename: str, feature: dict) -> dict:
+    """Returns cached features by (path, size, modification time), empty if the
+    cache is missing or was created with a different feature."""
+
+    if not os.path.isfile(filename):
+        return {}
+
+    try:
+        with np.load(filename) as data:
+            if json.loads(str(data["feature"])) != feature:
+                return {}
+            return {(str(path), int(size), int(mtime)): hist for path, size, mtime, hist in
+                    zip(data["paths"], data["sizes"], data["mtimes"], data["features"])}
+    except (OSError, ValueError, KeyError):
+        return {}
+
+
+def _save_feature_cache(filename: str, feature: dict, keys: list, input_data: list):
+    if not keys:
+        return
+
+    paths, sizes, mtimes = zip(*keys)
+    try:
+        np.savez(filename, feature=json.dumps(feature, sort_keys=True), paths=np.array(paths),
+                 sizes=np.array(sizes, dtype=np.int64), mtimes=np.array(mtimes, dtype=np.int64),
+                 features=np.stack(input_data))
+    except OSError:
+        # samples directory may be read-only, training works without cache
+        pass
+
+
+def _load_classifier(filename: str):
     if not os.path.isfile(filename):
         return None
+
+    # scikit-learn is imported on demand, it is not needed for exported classifiers
+    from joblib import load
     return load(filename)
 
 
-def _train_classifier(input_data, output_data, filename: str = None):
+def _train_classifier(input_data, output_data, filename: str = None, feature: dict = None,
+                      random_state: int = None, keys: list = None):
+    from joblib import dump
+    from sklearn.model_selection import train_test_split
+    from sklearn.neural_network import MLPClassifier
+
+    if feature is None:
+        feature = CHIP_FEATURE
+
     # instantiate classifier
     # Multi-layer Perceptron
-    clf = MLPClassifier(solver="lbfgs")
+    clf = MLPClassifier(solver="lbfgs", random_state=random_state)
 
-    # split samples into training and test data
-    x_train, x_test, y_train, y_test = train_test_split(input_data, output_data, test_size=.2)
+    # split samples into training and test data, keys identify the samples of input_data
+    if keys is None:
+        keys = [None] * len(input_data)
+    x_train, x_test, y_train, y_test, keys_train, _ = train_test_split(input_data, output_data, keys, test_size=.2,
+                                                                       random_state=random_state)
 
-    # train and score classifier
+    # train and score classifier, remember which feature it expects and which samples it was trained with
     clf.fit(x_train, y_train)
+    clf.chip_feature_ = dict(feature)
+    clf.chip_samples_ = {key for key in keys_train if key is not None}
     score = int(clf.score(x_test, y_test) * 100)
 
     if filename is not None:
@@ -177,9 +473,12 @@ def _train_classifier(input_data, output_data, filename: str = None):
     return clf, score
 
 
-def _detect_circles(image):
+def _detect_circles(image, scale: float = 1.0):
     global CHIP_MIN_RADIUS, CHIP_MAX_RADIUS, CHIP_MIN_DISTANCE
 
+    if scale != 1.0:
+        return _detect_circles_coarse_to_fine(image, scale)
+
     # blur the image using Gaussian blurring, where pixels closer to the center
     # contribute more "weight" to the average, first argument is the source image,
     # second argument is kernel size, third one is sigma (0 for autodetect)
@@ -200,9 +499,57 @@ def _detect_circles(image):
     return circles
 
 
+def _detect_circles_coarse_to_fine(image, scale: float):
+    global CHIP_MIN_RADIUS, CHIP_MAX_RADIUS, CHIP_MIN_DISTANCE
+
+    # same detection as in _detect_circles on the downscaled image, kernel and distances are scaled,
+    # center threshold is lowered to find candidates, which are confirmed in full resolution
+    small = cv2.resize(image, (0, 0), fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    kernel = max(3, int(round(9 * scale)) | 1)
+    blurred = cv2.GaussianBlur(small, (kernel, kernel), 0)
+    coarse = cv2.HoughCircles(blurred, cv2.HOUGH_GRADIENT, dp=max(1.0, 2.2 * scale),
+                              minDist=CHIP_MIN_DISTANCE * scale, param1=200, param2=COARSE_THRESHOLD * 100 * scale,
+                              minRadius=int(CHIP_MIN_RADIUS * scale), maxRadius=int(np.ceil(CHIP_MAX_RADIUS * scale)))
+    if coarse is None:
+        return None
+
+    # refine every candidate in a full resolution window around it
+    margin = int(np.ceil(2 / scale))
+    circles = []
+    for (x, y, r) in coarse[0] / scale:
+        circle = _refine_circle(image, x, y, r, margin)
+        if circle is not None:
+            circles.append(circle)
+
+    if len(circles) == 0:
+        return None
+    return np.array([circles], dtype=np.float32)
+
+
+def _refine_circle(image, x: float, y: float, r: float, margin: int) -> Optional[Tuple[float, float, float]]:
+    # window holding the circle with its possible displacement and the blur border
+    half = int(np.ceil(r)) + 2 * margin + 4
+    left, top = max(0, int(x) - half), max(0, int(y) - half)
+    window = image[top:int(y) + half + 1, left:int(x) + half + 1]
+
+    blurred = cv2.GaussianBlur(window, (9, 9), 0)
+    circles = cv2.HoughCircles(blurred, cv2.HOUGH_GRADIENT, dp=2.2, minDist=CHIP_MIN_DISTANCE, param1=200,
+                               param2=100, minRadius=max(CHIP_MIN_RADIUS, int(r) - margin),
+                               maxRadius=min(CHIP_MAX_RADIUS, int(np.ceil(r)) + margin))
+
+    # candidate is not a circle in full resolution
+    if circles is None:
+        return None
+    fx, fy, fr = circles[0][0]
+    return fx + left, fy + top, fr
+
+
 def _predict_chip(clf, roi) -> PokerChip:
+    if isinstance(clf, chip_color_table.ColorTableChipClassifier):
+        return _predict_chip_batch(clf, [roi])[0]
+
     # calculate feature vector for region of interest
-    hist = _calc_histogram(roi)
+    hist = _calc_feature(roi, _get_feature(clf))
 
     # predict chip value
     s = clf.predict([hist])
@@ -210,28 +557,54 @@ def _predict_chip(clf, roi) -> PokerChip:
     return PokerChip[s[0]]
 
 
-def _predict_chips(src, clf, circles, dst=None) -> List[PokerChip]:
+def _predict_chip_batch(clf, rois) -> List[PokerChip]:
+    # color table votes with pixels of the regions directly
+    if isinstance(clf, chip_color_table.ColorTableChipClassifier):
+        rois = np.asarray(rois)
+        return [PokerChip[name] for name in clf.predict_rois(rois, _circle_mask(rois.shape[1:3]))]
+
+    # calculate feature matrix with one row per region of interest
+    features = _calc_features(rois, _get_feature(clf))
+
+    # predict values of all chips with a single call
+    s = clf.predict(features)
+
+    return [PokerChip[name] for name in s]
+
+
+def _predict_chips(src, clf, circles, dst=None,
+                   tracker: ChipTracker = None) -> List[Tuple[PokerChip, Tuple[int, int]]]:
     if len(circles) == 0:
         return []
 
-    predictions = []
-
     # convert coordinates and radii to integers
     circles = np.round(circles[0, :]).astype("int")
 
-    # loop over coordinates and radii of the circles
-    for (x, y, d) in circles:
-        # extract region of interest
-        roi = src[y - d:y + d, x - d:x + d]
+    # skip circles with empty regions of interest
+    circles = np.array([(x, y, d) for (x, y, d) in circles if src[y - d:y + d, x - d:x + d].size != 0],
+                       dtype="int").reshape(-1, 3)
 
-        if roi.size == 0:
-            continue
+    # chips which did not move keep their previous value
+    chips = tracker.find(circles) if tracker is not None else [None] * len(circles)
+    unmatched = [i for i, chip in enumerate(chips) if chip is None]
+
+    # extract regions of interest of all remaining circles into one stack
+    if unmatched:
+        rois = np.empty((len(unmatched), CHIP_ROI_SIZE[1], CHIP_ROI_SIZE[0], 3), dtype=np.uint8)
+        for row, i in enumerate(unmatched):
+            x, y, d = circles[i]
+            cv2.resize(src[y - d:y + d, x - d:x + d], CHIP_ROI_SIZE, dst=rois[row])
 
-        roi = cv2.resize(roi, (128, 128))
+        # try recognition of all chip features at once
+        for i, prediction in zip(unmatched, _predict_chip_batch(clf, rois)):
+            chips[i] = prediction
 
-        # try recognition of chip feature and add result to list
-        prediction = _predict_chip(clf, roi)
-        predictions.append(prediction)
+    if tracker is not None:
+        tracker.update(circles, chips)
+
+    predictions = []
+    for prediction, (x, y, d) in zip(chips, circles):
+        predictions.append((prediction, (x, y)))
 
         if prediction.name == PokerChip.unknown.name:
             continue
@@ -0,0 +1,54 @@
+import argparse
+import os
+import tempfile
+import time
+
+from joblib import dump
+
+from logic.benchmark_functions import load_chip_rois, repeat_files, time_function
+from logic.chip_detector import chip_detection
+
+
+def parse_arguments():
+    # construct argument parser and parse arguments
+    ap = argparse.ArgumentParser()
+    ap.add_argument("-s", "--samples", required=False, help="path to sample images", default="sample_images")
+    ap.add_argument("-r", "--repeats", required=False, type=int, help="number of timed frames", default=20)
+    ap.add_argument("--seed", required=False, type=int, help="seed of train/test split and classifier",
+                    default=0)
+    return vars(ap.parse_args())
+
+
+def _model_size(clf) -> int:
+    """Returns size of the classifier saved with joblib in bytes."""
+
+    with tempfile.TemporaryDirectory() as directory:
+        filename = os.path.join(directory, "classifier.joblib")
+        dump(clf, filename)
+        return os.path.getsize(filename)
+
+
+def main():
+    args = parse_arguments()
+
+    features = (("full histogram", {"version": 1}), ("compact", chip_detection.CHIP_FEATURE))
+    files, _, _ = chip_detection._locate_sample_images(args["samples"])
+    rois = load_chip_rois(repeat_files(files, 10))
+
+    print("{:>14} {:>8} {:>9} {:>10} {:>10} {:>12}".format(
+        "feature", "inputs", "accuracy", "train s", "ms/chip", "model KiB"))
+    for name, feature in features:
+        input_data, output_data = chip_detection._create_training_data_sets(args["samples"], feature)
+
+        start_time = time.perf_counter()
+        clf, score = chip_detection._train_classifier(input_data, output_data, feature=feature,
+                                                      random_state=args["seed"])
+        train_time = time.perf_counter() - start_time
+
+        chip_time = time_function(lambda: chip_detection._predict_chip_batch(clf, rois), args["repeats"]) / len(rois)
+        print("{:>14} {:>8} {:>8}% {:>10.2f} {:>10.3f} {:>12.1f}".format(
+            name, len(input_data[0]), score, train_time, chip_time * 1000, _model_size(clf) / 1024))
+
+
+if __name__ == "__main__":
+    main()
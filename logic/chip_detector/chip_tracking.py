@@ -0,0 +1,51 @@
+from typing import List, Optional
+
+import numpy as np
+
+from enums.poker_chip_enum import PokerChip
+
+
+class ChipTracker:
+    """Remembers chips classified in the previous frame of a video, so circles
+    which did not move can reuse their value instead of being histogrammed
+    and classified again."""
+
+    def __init__(self, tolerance: float = 4.0, recheck_interval: int = 30):
+        self.tolerance = tolerance  # Maximum movement of center and change of radius in pixels
+        self.recheck_interval = recheck_interval  # Every that many frames all chips are classified again
+        self.hits = 0  # Number of chips which reused previous value
+        self.misses = 0  # Number of chips which had to be classified
+        self._frame = 0
+        self._circles = np.empty((0, 3))
+        self._chips: List[PokerChip] = []
+
+    def find(self, circles: np.ndarray) -> List[Optional[PokerChip]]:
+        """Returns for every circle (x, y, radius) the chip from the previous frame
+        at the same place, or None if the circle has to be classified."""
+
+        if self._frame % self.recheck_interval == 0 or len(self._circles) == 0:
+            self.misses += len(circles)
+            return [None] * len(circles)
+
+        # distances of all circles to all previous circles at once
+        circles = np.asarray(circles, dtype=np.float64).reshape(-1, 3)
+        distances = np.hypot(circles[:, np.newaxis, 0] - self._circles[:, 0],
+                             circles[:, np.newaxis, 1] - self._circles[:, 1])
+        radius_changes = np.abs(circles[:, np.newaxis, 2] - self._circles[:, 2])
+        distances[radius_changes > self.tolerance] = np.inf
+
+        closest = np.argmin(distances, axis=1)
+        matched = distances[np.arange(len(circles)), closest] <= self.tolerance
+
+        self.hits += int(np.count_nonzero(matched))
+        self.misses += len(circles) - int(np.count_nonzero(matched))
+        return [self._chips[i] if is_matched else None for i, is_matched in zip(closest, matched)]
+
+    def update(self, circles: np.ndarray, chips: List[PokerChip]) -> None:
+        """Stores circles and chips of the current frame. Chips which were not
+        recognized are left out, so they are classified again in the next frame."""
+
+        known = [i for i, chip in enumerate(chips) if chip != PokerChip.unknown]
+        self._circles = np.asarray(circles, dtype=np.float64).reshape(-1, 3)[known]
+        self._chips = [chips[i] for i in known]
+        self._frame += 1
@@ -8,11 +8,16 @@ from logic.chip_detector import chip_detection
 
 _community_mask = None
 _player_masks = []
+_signature_masks = []
+_label_map = None
 _description_mask = None
 _description_overlay = None
 _players = 4
 _community_cards_offset = 180
 
+# Size in pixels of the square table block summarized by one signature pixel
+SIGNATURE_BLOCK = 16
+
 
 def divide_table(img):
     global _community_mask, _player_masks
@@ -24,6 +29,40 @@ def divide_table(img):
     return community_image, player_images
 
 
+def get_region_masks() -> List[np.ndarray]:
+    """Returns masks of all table regions, community cards first and then players."""
+    global _community_mask, _player_masks
+
+    return [_community_mask] + _player_masks
+
+
+def get_region_label(point) -> int:
+    """Returns region containing the point, 0 for community cards, i + 1 for
+    player i, and -1 if the point is outside all regions."""
+    global _label_map
+
+    x = min(max(int(point[0]), 0), _label_map.shape[1] - 1)
+    y = min(max(int(point[1]), 0), _label_map.shape[0] - 1)
+    return int(_label_map[y, x]) - 1
+
+
+def table_signature(img) -> np.ndarray:
+    """Returns grayscale thumbnail of the image with one pixel per table block,
+    cheap to compare between frames. Image may already be grayscale."""
+
+    gray = img if img.ndim == 2 else cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    return cv2.resize(gray, _signature_size(gray.shape), interpolation=cv2.INTER_AREA)
+
+
+def region_difference(signature: np.ndarray, reference: np.ndarray, region: int) -> int:
+    """Returns the largest block difference between two table signatures inside
+    the region (0 for community cards, i + 1 for player i)."""
+    global _signature_masks
+
+    diff = cv2.absdiff(signature, reference)
+    return int(np.max(diff[_signature_masks[region]], initial=0))
+
+
 def put_overlay_on_image(img):
     global _description_overlay, _description_mask
 
@@ -34,7 +73,7 @@ def put_overlay_on_image(img):
     return img_result
 
 
-def setup(img, classifier_path: str = "chip_classifier.joblib", detect_chips: bool = True) -> int:
+def setup(img, classifier_path: str = chip_detection.CLASSIFIER_FILENAME, detect_chips: bool = True) -> int:
     global _players
 
     _detect_chips = detect_chips
@@ -182,8 +221,13 @@ def _get_player_cards_cutouts(img: np.ndarray, players: int, community_mask=None
     return player_masks
 
 
+def _signature_size(shape: tuple) -> Tuple[int, int]:
+    height, width = shape[:2]
+    return max(1, round(width / SIGNATURE_BLOCK)), max(1, round(height / SIGNATURE_BLOCK))
+
+
 def _setup_masks(img: np.ndarray, players: int = 4, comm_cards_center_offset: int = 180) -> None:
-    global _community_mask, _player_masks, _description_overlay, _description_mask
+    global _community_mask, _player_masks, _signature_masks, _label_map, _description_overlay, _description_mask
 
     round_community_cutout = False
     if players > 2:
@@ -192,6 +236,15 @@ def _setup_masks(img: np.ndarray, players: int = 4, comm_cards_center_offset: in
     _community_mask = _get_community_cards_cutout(img, comm_cards_center_offset, round_community_cutout)
     _player_masks = _get_player_cards_cutouts(img, players, community_mask=_community_mask)
 
+    # Single image labeling every pixel with its region number plus one (0 outside all regions)
+    _label_map = np.zeros(img.shape[:2], np.uint8)
+    for region, mask in enumerate(get_region_masks()):
+        _label_map[mask > 0] = region + 1
+
+    # Every block touching a region belongs to its signature mask
+    _signature_masks = [cv2.resize(mask, _signature_size(mask.shape), interpolation=cv2.INTER_AREA) > 0
+                        for mask in get_region_masks()]
+
     _description_overlay = np.zeros(img.shape, np.uint8)
 
     _process_cutout(_community_mask, _description_overlay, "Community cards", draw_contour=True)
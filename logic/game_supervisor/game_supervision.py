@@ -1,42 +1,145 @@
 import argparse
 import time
-from typing import List
+from typing import List, Optional
 
 import cv2
 import numpy as np
 
+from classes.frame_context import FrameContext
 from classes.player import Player
 from classes.poker_card import PokerCard
 from gui.pokevisor_status_ui import PokeVisorStatusUi
 from logic.card_detector import card_detection
+from logic.card_detector.card_tracking import CardTracker
 from logic.chip_detector import chip_detection
+from logic.chip_detector.chip_tracking import ChipTracker
 from logic.game_supervisor import game_image_processing
+from logic.game_supervisor.region_cache import RegionCache
 from logic.hand_selecter.hand_checking import Checker
 
 image = np.zeros((1, 1))
 
 
-def supervise(frame: np.ndarray, dst: np.ndarray = None) -> tuple:
-    community_image, player_images = game_image_processing.divide_table(frame)
-    community_cards, community_cards_cnt = card_detection.detect_cards(community_image, dst)
-    community_chips = chip_detection.detect_chips(community_image, dst, community_cards_cnt)
+def supervise(frame: np.ndarray, dst: np.ndarray = None, card_trackers: List[CardTracker] = None,
+              region_cache: RegionCache = None, chip_trackers: List[ChipTracker] = None) -> tuple:
+    region_masks = game_image_processing.get_region_masks()
 
-    player_cards_list = []
-    player_chips_list = []
-    for i in range(len(player_images)):
-        cards, cards_cnt = card_detection.detect_cards(player_images[i], dst)
-        chips = chip_detection.detect_chips(player_images[i], dst, cards_cnt)
-        player_cards_list.append(sorted(cards))
-        player_chips_list.append(chips)
+    # One tracker per region, the first one is used for community cards and chips
+    if card_trackers is None:
+        card_trackers = [None] * len(region_masks)
+    if chip_trackers is None:
+        chip_trackers = [None] * len(region_masks)
 
-    return sorted(community_cards), player_cards_list, community_chips, player_chips_list
+    # Color conversions of the frame are shared by all regions and detectors
+    frame = _undrawn_frame(frame, dst)
+    frame_context = FrameContext(frame)
 
+    if region_cache is not None:
+        region_cache.update_signature(frame_context.gray)
 
-def supervise_video(cap, players: int = 2) -> None:
+    cards_list = []
+    chips_list = []
+    for i in range(len(region_masks)):
+        cached = region_cache.find(i) if region_cache is not None else None
+
+        if cached is None:
+            # Remember what was drawn for the region, so it can be drawn again while region is unchanged
+            dst_before = dst.copy() if dst is not None and region_cache is not None else None
+
+            region_context = frame_context.region(region_masks[i])
+            cards, cards_cnt = card_detection.detect_cards(frame, dst, card_trackers[i], context=region_context)
+            chips = chip_detection.detect_chips(frame, dst, cards_cnt, context=region_context,
+                                                tracker=chip_trackers[i])
+
+            if region_cache is not None:
+                region_cache.store(i, (cards, chips, _record_drawing(dst_before, dst)))
+        else:
+            cards, chips, drawing = cached
+            _replay_drawing(drawing, dst)
+
+        cards_list.append(cards)
+        chips_list.append(chips)
+
+    return _split_results(cards_list, chips_list)
+
+
+def supervise_single_pass(frame: np.ndarray, dst: np.ndarray = None, card_tracker: CardTracker = None,
+                          chip_tracker: ChipTracker = None) -> tuple:
+    """Same as supervise, but cards and chips are detected once in the whole frame
+    and assigned to regions by their centers, so cost does not grow with players."""
+
+    regions = len(game_image_processing.get_region_masks())
+    frame = _undrawn_frame(frame, dst)
+    frame_context = FrameContext(frame)
+
+    cards = card_detection.detect_card_infos(frame, dst, card_tracker, context=frame_context)
+    chips = chip_detection.detect_chip_positions(frame, dst, [card.contour for card in cards], context=frame_context,
+                                                 tracker=chip_tracker)
+
+    cards_list = [[] for _ in range(regions)]
+    for card in cards:
+        region = game_image_processing.get_region_label(card.center)
+        if region >= 0:
+            cards_list[region].append(card.to_poker_card())
+
+    chips_list = [[] for _ in range(regions)]
+    for chip, center in chips:
+        region = game_image_processing.get_region_label(center)
+        if region >= 0:
+            chips_list[region].append(chip)
+
+    return _split_results(cards_list, chips_list)
+
+
+def _undrawn_frame(frame: np.ndarray, dst: np.ndarray) -> np.ndarray:
+    # detectors draw on dst while later detections still read the frame and its lazily computed variants,
+    # so a frame which is also the drawing target is copied before anything is drawn
+    if dst is not None and np.shares_memory(frame, dst):
+        return frame.copy()
+    return frame
+
+
+def _split_results(cards_list: list, chips_list: list) -> tuple:
+    # The first region holds community cards and chips, the others belong to players
+    player_cards_list = [sorted(cards) for cards in cards_list[1:]]
+    return sorted(cards_list[0]), player_cards_list, chips_list[0], chips_list[1:]
+
+
+def _record_drawing(dst_before: np.ndarray, dst: np.ndarray) -> Optional[tuple]:
+    if dst_before is None:
+        return None
+
+    ys, xs = np.nonzero(np.any(dst != dst_before, axis=2))
+    return ys, xs, dst[ys, xs]
+
+
+def _replay_drawing(drawing: Optional[tuple], dst: np.ndarray) -> None:
+    if drawing is None or dst is None:
+        return
+
+    ys, xs, pixels = drawing
+    dst[ys, xs] = pixels
+
+
+def supervise_video(cap, players: int = 2, track_cards: bool = False, skip_static_regions: bool = False,
+                    single_pass: bool = False, track_chips: bool = False) -> None:
     status_ui = PokeVisorStatusUi(players=players)
     fps = 60
     frame_time = round(1000 / fps)
 
+    # Single pass detection covers the whole frame with one tracker and can not skip regions
+    card_trackers = None
+    if track_cards:
+        card_trackers = [CardTracker() for _ in range(1 if single_pass else players + 1)]
+
+    chip_trackers = None
+    if track_chips:
+        chip_trackers = [ChipTracker() for _ in range(1 if single_pass else players + 1)]
+
+    region_cache = None
+    if skip_static_regions and not single_pass:
+        region_cache = RegionCache()
+
     while cap.isOpened():
         start_time = time.time()
         ret, frame = cap.read()
@@ -44,7 +147,13 @@ def supervise_video(cap, players: int = 2) -> None:
         if not ret:
             break
 
-        community_cards, player_cards_list, community_chips, player_chips_list = supervise(frame, dst=frame)
+        if single_pass:
+            community_cards, player_cards_list, community_chips, player_chips_list = supervise_single_pass(
+                frame, dst=frame, card_tracker=card_trackers[0] if card_trackers is not None else None,
+                chip_tracker=chip_trackers[0] if chip_trackers is not None else None)
+        else:
+            community_cards, player_cards_list, community_chips, player_chips_list = supervise(
+                frame, dst=frame, card_trackers=card_trackers, region_cache=region_cache, chip_trackers=chip_trackers)
 
         table = game_image_processing.put_overlay_on_image(frame)
         if _check_if_cards_uncovered(community_cards, player_cards_list):
@@ -60,6 +169,16 @@ def supervise_video(cap, players: int = 2) -> None:
             wait_time = 1
         if cv2.waitKey(wait_time) & 0xFF == ord('q'):
             break
+
+    if card_trackers is not None:
+        print("Tracked cards: {}, classified cards: {}".format(sum(tracker.hits for tracker in card_trackers),
+                                                                sum(tracker.misses for tracker in card_trackers)))
+    if chip_trackers is not None:
+        print("Tracked chips: {}, classified chips: {}".format(sum(tracker.hits for tracker in chip_trackers),
+                                                                sum(tracker.misses for tracker in chip_trackers)))
+    if region_cache is not None:
+        print("Unchanged regions: {}, detected regions: {}".format(region_cache.hits, region_cache.misses))
+
     cv2.destroyAllWindows()
     status_ui.destroy()
     cap.release()
@@ -97,6 +216,14 @@ def _parse_arguments() -> vars:
     ap = argparse.ArgumentParser()
     ap.add_argument("-i", "--image", required=False, help="path to image", default="cards_input.png")
     ap.add_argument("-m", "--movie", required=False, help="path to movie", default="demo_movie.mp4")
+    ap.add_argument("-t", "--track-cards", required=False, action="store_true",
+                    help="reuse rank and suit of cards which did not move between frames")
+    ap.add_argument("-c", "--track-chips", required=False, action="store_true",
+                    help="reuse value of chips which did not move between frames")
+    ap.add_argument("-s", "--skip-static", required=False, action="store_true",
+                    help="skip detection in table regions which did not change between frames")
+    ap.add_argument("-p", "--single-pass", required=False, action="store_true",
+                    help="detect cards and chips once in the whole frame instead of once per region")
     return vars(ap.parse_args())
 
 
@@ -150,7 +277,8 @@ def _video_example():
 
     game_image_processing.setup(frame, detect_chips=False)
 
-    supervise_video(cap)
+    supervise_video(cap, track_cards=args["track_cards"], skip_static_regions=args["skip_static"],
+                    single_pass=args["single_pass"], track_chips=args["track_chips"])
     cap.release()
 
 
@@ -0,0 +1,42 @@
+from typing import Optional
+
+import numpy as np
+
+from logic.game_supervisor import game_image_processing
+
+
+class RegionCache:
+    """Stores detection results of every table region together with the table
+    signature from the moment of detection, so regions which did not change
+    since then can skip card and chip detection."""
+
+    def __init__(self, threshold: int = 12):
+        self.threshold = threshold  # Largest block difference (0-255) of a region considered unchanged
+        self.hits = 0  # Number of regions which reused stored results
+        self.misses = 0  # Number of regions which had to be detected
+        self._signature: np.ndarray = None
+        self._entries = {}
+
+    def update_signature(self, frame: np.ndarray) -> None:
+        """Computes signature of the current frame (BGR or grayscale), has to be
+        called once per frame."""
+
+        self._signature = game_image_processing.table_signature(frame)
+
+    def find(self, region: int) -> Optional[tuple]:
+        """Returns stored results of the region, or None if it changed and has to be detected."""
+
+        if region in self._entries:
+            reference, results = self._entries[region]
+            if reference.shape == self._signature.shape and \
+                    game_image_processing.region_difference(self._signature, reference, region) <= self.threshold:
+                self.hits += 1
+                return results
+
+        self.misses += 1
+        return None
+
+    def store(self, region: int, results: tuple) -> None:
+        """Stores detection results of the region for the current frame."""
+
+        self._entries[region] = (self._signature, results)
@@ -0,0 +1,89 @@
+from concurrent.futures import ProcessPoolExecutor
+from itertools import combinations
+from math import comb
+from typing import List
+
+import numpy as np
+
+from classes.poker_card import PokerCard
+from classes.seat_equity import SeatEquity
+from logic.hand_selecter import hand_evaluation
+
+# Boards are enumerated if there are at most that many of them, otherwise sampled
+EXHAUSTIVE_LIMIT = 1000
+
+# Samples are evaluated in chunks of that many boards to bound memory
+CHUNK_SIZE = 20000
+
+
+def calculate_equity(players_cards: List[List[PokerCard]], community_cards: List[PokerCard], samples: int = 20000,
+                     workers: int = 1, seed=None) -> List[SeatEquity]:
+    """Calculates win and tie probabilities of every seat. Unknown or missing
+    hole cards and community cards are dealt from the remaining deck. Remaining
+    boards are enumerated when all hole cards are known and there are few
+    boards left (turn, river, usually flop), otherwise samples random deals.
+    Sampling is spread across that many worker processes, seed is an integer
+    or a numpy SeedSequence."""
+
+    holes = [[hand_evaluation.card_index(card) for card in cards if not card.is_unknown()][:2]
+             for cards in players_cards]
+    board = [hand_evaluation.card_index(card) for card in community_cards if not card.is_unknown()][:5]
+
+    known = [index for hole in holes for index in hole] + board
+    deck = np.setdiff1d(np.arange(52), known)
+    missing = [2 - len(hole) for hole in holes] + [5 - len(board)]
+
+    if sum(missing[:-1]) == 0 and comb(len(deck), missing[-1]) <= EXHAUSTIVE_LIMIT:
+        deals = np.array(list(combinations(deck, missing[-1])), dtype=np.intp)
+        wins, ties, shares = _count_results(holes, board, missing, deals)
+        count = len(deals)
+    else:
+        chunks = [min(CHUNK_SIZE, samples - start) for start in range(0, samples, CHUNK_SIZE)]
+        if not isinstance(seed, np.random.SeedSequence):
+            seed = np.random.SeedSequence(seed)
+        seeds = seed.spawn(len(chunks))
+        arguments = ([holes] * len(chunks), [board] * len(chunks), [deck] * len(chunks), chunks, seeds)
+
+        if workers == 1 or len(chunks) == 1:
+            results = list(map(_simulate, *arguments))
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                results = list(executor.map(_simulate, *arguments))
+
+        wins, ties, shares = (np.sum(values, axis=0) for values in zip(*results))
+        count = samples
+
+    return [SeatEquity(float(win / count), float(tie / count), float(share / count))
+            for win, tie, share in zip(wins, ties, shares)]
+
+
+def _simulate(holes: List[List[int]], board: List[int], deck: np.ndarray, samples: int,
+              seed: np.random.SeedSequence) -> tuple:
+    # every sample deals the missing cards of all seats and the board from a shuffled remaining deck
+    rng = np.random.default_rng(seed)
+    missing = [2 - len(hole) for hole in holes] + [5 - len(board)]
+    dealt = sum(missing)
+    order = np.argpartition(rng.random((samples, len(deck))), dealt - 1, axis=1)[:, :dealt] if dealt else \
+        np.empty((samples, 0), dtype=np.intp)
+    return _count_results(holes, board, missing, deck[order])
+
+
+def _count_results(holes: List[List[int]], board: List[int], missing: List[int], deals: np.ndarray) -> tuple:
+    # deals hold missing hole cards of every seat followed by missing community cards
+    n = len(deals)
+    offsets = np.cumsum([0] + missing)
+    full_board = np.hstack((np.tile(board, (n, 1)).astype(np.intp), deals[:, offsets[-2]:offsets[-1]]))
+
+    strengths = np.empty((len(holes), n), dtype=np.int64)
+    for seat, hole in enumerate(holes):
+        cards = np.hstack((np.tile(hole, (n, 1)).astype(np.intp), deals[:, offsets[seat]:offsets[seat + 1]],
+                           full_board))
+        strengths[seat] = hand_evaluation.evaluate_batch(cards)
+
+    # seats with the best strength share the pot
+    best = strengths == strengths.max(axis=0)
+    winners = best.sum(axis=0)
+    wins = (best & (winners == 1)).sum(axis=1)
+    ties = (best & (winners > 1)).sum(axis=1)
+    shares = (best / winners).sum(axis=1)
+    return wins, ties, shares
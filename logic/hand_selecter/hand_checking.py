@@ -1,34 +1,57 @@
 from collections import defaultdict
+from functools import lru_cache
 from itertools import combinations
-from typing import List
+from typing import FrozenSet, List
 
 from classes.poker_card import PokerCard
 from enums.card_rank_enum import CardRank
 from enums.card_suit_enum import CardSuit
 # hand is best 5 cards
 from enums.poker_hand_enum import PokerHand
+from logic.hand_selecter import hand_evaluation
 
 
 class Checker:
 
     @staticmethod
     def get_best_hand(player_cards: List[PokerCard], community_cards: List[PokerCard]) -> PokerHand:
-        best_hand = PokerHand.high_card
-        for i in range(6):
-            possible_combos = combinations(player_cards, 5 - i)
-            for combo in possible_combos:
-                current_hand = list(combo) + community_cards[:i]
-                current_hand = Checker.check_hand(current_hand)
-                if current_hand.value > best_hand.value:
-                    best_hand = current_hand
+        """Returns category of the best hand made of player and community cards,
+        evaluated with precomputed tables of hand_evaluation."""
 
-        return best_hand
+        cards = frozenset(card for card in player_cards + community_cards if not card.is_unknown())
+        return Checker._get_best_hand_of_set(cards)
+
+    @staticmethod
+    @lru_cache(maxsize=4096)
+    def _get_best_hand_of_set(cards: FrozenSet[PokerCard]) -> PokerHand:
+        # cards are interned, so equal card sets of consecutive frames hit the cache
+        return Checker._evaluate(cards)
 
     @staticmethod
     def check_hand(hand: List[PokerCard]) -> PokerHand:
-        if Checker._check_royal_flush(hand):
-            return PokerHand.royal_flush
-        if Checker._check_royal_flush(hand):
+        # unknown cards are left out like in get_best_hand
+        return Checker._evaluate([card for card in hand if not card.is_unknown()])
+
+    @staticmethod
+    def _evaluate(cards) -> PokerHand:
+        if len(cards) == 0:
+            return PokerHand.high_card
+        if len(cards) <= hand_evaluation.MAX_CARDS:
+            _, hand = hand_evaluation.evaluate(cards)
+            return hand
+
+        # more cards than a player can use, for example misdetected ones, best of all 7 card subsets counts
+        strength = max(hand_evaluation.evaluate(subset)[0] for subset in combinations(cards, hand_evaluation.MAX_CARDS))
+        return hand_evaluation.hand_category(strength)
+
+    @staticmethod
+    def check_hand_by_rules(hand: List[PokerCard]) -> PokerHand:
+        """Checks category of a 5 card hand rule by rule, kept as reference for hand_evaluation."""
+
+        if Checker._check_royal_straight(hand):
+            if max(card.rank.value for card in hand) == CardRank.king.value and \
+                    min(card.rank.value for card in hand) == CardRank.ace.value:
+                return PokerHand.royal_flush
             return PokerHand.royal_straight
         if Checker._check_four_of_a_kind(hand):
             return PokerHand.four_of_a_kind
@@ -0,0 +1,282 @@
+import argparse
+import json
+import sys
+import time
+from itertools import chain, combinations
+
+import numpy as np
+
+from enums.poker_hand_enum import PokerHand
+from logic.hand_selecter import hand_evaluation
+from logic.hand_selecter.hand_checking import Checker
+
+# Number of hands of every category among all 2,598,960 five card hands
+FIVE_CARD_FREQUENCIES = {
+    PokerHand.royal_flush: 4,
+    PokerHand.royal_straight: 36,
+    PokerHand.four_of_a_kind: 624,
+    PokerHand.full_house: 3744,
+    PokerHand.flush: 5108,
+    PokerHand.straight: 10200,
+    PokerHand.three_of_a_kind: 54912,
+    PokerHand.two_pairs: 123552,
+    PokerHand.pair: 1098240,
+    PokerHand.high_card: 1302540,
+}
+
+# Number of hands of every best category among all 133,784,560 seven card hands
+SEVEN_CARD_FREQUENCIES = {
+    PokerHand.royal_flush: 4324,
+    PokerHand.royal_straight: 37260,
+    PokerHand.four_of_a_kind: 224848,
+    PokerHand.full_house: 3473184,
+    PokerHand.flush: 4047644,
+    PokerHand.straight: 6180020,
+    PokerHand.three_of_a_kind: 6461620,
+    PokerHand.two_pairs: 31433400,
+    PokerHand.pair: 58627800,
+    PokerHand.high_card: 23294460,
+}
+
+# Sampled category counts may differ from expected counts by that many standard deviations
+SAMPLE_TOLERANCE = 5.0
+
+# Number of hands evaluated at once
+CHUNK_SIZE = 1 << 16
+
+
+def parse_arguments():
+    # construct argument parser and parse arguments
+    ap = argparse.ArgumentParser()
+    ap.add_argument("-n", "--hands", required=False, type=int, help="number of random 7 card hands", default=1000000)
+    ap.add_argument("-e", "--eight-card-hands", required=False, type=int,
+                    help="number of random 8 card hands, more cards than a player can use", default=20000)
+    ap.add_argument("-r", "--rule-hands", required=False, type=int,
+                    help="number of 5 and 7 card hands compared with the rule based checks", default=20000)
+    ap.add_argument("-o", "--output", required=False, help="path to JSON report, printed if not given")
+    ap.add_argument("-b", "--baseline", required=False, help="path to JSON report of an earlier run to compare speed")
+    ap.add_argument("--max-slowdown", required=False, type=float,
+                    help="fail if evaluations per second drop below this share of the baseline", default=0.7)
+    ap.add_argument("--seed", required=False, type=int, help="seed of random hands", default=0)
+    return vars(ap.parse_args())
+
+
+def verify_five_card_hands(rule_hands: int, rng: np.random.RandomState) -> dict:
+    """Evaluates all five card hands with check_hand and evaluate_batch, compares
+    category counts with known totals and a sample with the rule based checks."""
+
+    indices = np.fromiter(chain.from_iterable(combinations(range(52), 5)), dtype=np.int8).reshape(-1, 5)
+
+    counts = dict.fromkeys(FIVE_CARD_FREQUENCIES, 0)
+    mismatches = 0
+    check_hand_time = 0.0
+    batch_time = 0.0
+    for start in range(0, len(indices), CHUNK_SIZE):
+        chunk = indices[start:start + CHUNK_SIZE]
+        card_lists = _card_lists(chunk)
+
+        start_time = time.perf_counter()
+        hands = [Checker.check_hand(cards) for cards in card_lists]
+        check_hand_time += time.perf_counter() - start_time
+
+        start_time = time.perf_counter()
+        strengths = hand_evaluation.evaluate_batch(chunk)
+        batch_time += time.perf_counter() - start_time
+
+        for hand, strength in zip(hands, strengths):
+            counts[hand] += 1
+            if hand_evaluation.hand_category(strength) != hand:
+                mismatches += 1
+
+    # rule checks are slow, only a sample is compared
+    sample = _card_lists(indices[rng.choice(len(indices), min(rule_hands, len(indices)), replace=False)])
+    start_time = time.perf_counter()
+    rule_results = [Checker.check_hand_by_rules(cards) for cards in sample]
+    rule_time = time.perf_counter() - start_time
+    rule_mismatches = sum(1 for cards, hand in zip(sample, rule_results) if Checker.check_hand(cards) != hand)
+
+    return {
+        "hands": len(indices),
+        "categories": _category_report(counts, FIVE_CARD_FREQUENCIES, exact=True),
+        "batch_mismatches": mismatches,
+        "rule_hands": len(sample),
+        "rule_mismatches": rule_mismatches,
+        "evaluations_per_second": {
+            "check_hand": len(indices) / check_hand_time,
+            "evaluate_batch": len(indices) / batch_time,
+            "check_hand_by_rules": len(sample) / rule_time,
+        },
+    }
+
+
+def verify_seven_card_hands(hands: int, rule_hands: int, rng: np.random.RandomState) -> dict:
+    """Evaluates random seven card hands with get_best_hand and evaluate_batch,
+    compares category counts with known frequencies and a sample with the best
+    of the rule based checks of all 21 five card combinations."""
+
+    indices = np.argsort(rng.rand(hands, 52), axis=1)[:, :7].astype(np.int8)
+
+    counts = dict.fromkeys(SEVEN_CARD_FREQUENCIES, 0)
+    mismatches = 0
+    best_hand_time = 0.0
+    batch_time = 0.0
+    Checker._get_best_hand_of_set.cache_clear()
+    for start in range(0, len(indices), CHUNK_SIZE):
+        chunk = indices[start:start + CHUNK_SIZE]
+        card_lists = _card_lists(chunk)
+
+        # two player cards and five community cards
+        start_time = time.perf_counter()
+        best_hands = [Checker.get_best_hand(cards[:2], cards[2:]) for cards in card_lists]
+        best_hand_time += time.perf_counter() - start_time
+
+        start_time = time.perf_counter()
+        strengths = hand_evaluation.evaluate_batch(chunk)
+        batch_time += time.perf_counter() - start_time
+
+        for hand, strength in zip(best_hands, strengths):
+            counts[hand] += 1
+            if hand_evaluation.hand_category(strength) != hand:
+                mismatches += 1
+    cache_info = Checker._get_best_hand_of_set.cache_info()
+
+    sample = _card_lists(indices[:rule_hands])
+    start_time = time.perf_counter()
+    rule_results = [_best_hand_by_rules(cards) for cards in sample]
+    rule_time = time.perf_counter() - start_time
+    rule_mismatches = sum(1 for cards, hand in zip(sample, rule_results)
+                          if Checker.get_best_hand(cards[:2], cards[2:]) != hand)
+
+    return {
+        "hands": len(indices),
+        "categories": _category_report(counts, SEVEN_CARD_FREQUENCIES, exact=False),
+        "batch_mismatches": mismatches,
+        "rule_hands": len(sample),
+        "rule_mismatches": rule_mismatches,
+        "cache_hits": cache_info.hits,
+        "evaluations_per_second": {
+            "get_best_hand": len(indices) / best_hand_time if len(indices) else 0.0,
+            "evaluate_batch": len(indices) / batch_time if len(indices) else 0.0,
+            "best_of_21_rule_checks": len(sample) / rule_time if len(sample) else 0.0,
+        },
+    }
+
+
+def verify_eight_card_hands(hands: int, rng: np.random.RandomState) -> dict:
+    """Evaluates random eight card hands, like with a misdetected extra card, with
+    get_best_hand and compares them with the best of their seven card subsets
+    evaluated by evaluate_batch. Also checks that hand_evaluation rejects them."""
+
+    indices = np.argsort(rng.rand(hands, 52), axis=1)[:, :8].astype(np.int8)
+
+    # best strength of the 8 subsets which leave out one card
+    subsets = np.array([[j for j in range(8) if j != i] for i in range(8)])
+    reference = np.zeros(len(indices), dtype=np.int64)
+    for subset in subsets:
+        reference = np.maximum(reference, hand_evaluation.evaluate_batch(indices[:, subset]))
+
+    card_lists = _card_lists(indices)
+    Checker._get_best_hand_of_set.cache_clear()
+    start_time = time.perf_counter()
+    best_hands = [Checker.get_best_hand(cards[:3], cards[3:]) for cards in card_lists]
+    best_hand_time = time.perf_counter() - start_time
+    mismatches = sum(1 for hand, strength in zip(best_hands, reference)
+                     if hand_evaluation.hand_category(strength) != hand)
+
+    rejected = {}
+    for name, function in (("evaluate_indices", lambda: hand_evaluation.evaluate_indices(indices[0].tolist())),
+                           ("evaluate_batch", lambda: hand_evaluation.evaluate_batch(indices[:1]))):
+        try:
+            function()
+            rejected[name] = False
+        except ValueError:
+            rejected[name] = True
+
+    return {
+        "hands": len(indices),
+        "mismatches": mismatches,
+        "rejected": rejected,
+        "evaluations_per_second": {
+            "get_best_hand": len(indices) / best_hand_time if len(indices) else 0.0,
+        },
+    }
+
+
+def compare_with_baseline(report: dict, baseline: dict, max_slowdown: float) -> list:
+    """Returns names of evaluations which got slower than max_slowdown times
+    their speed in the baseline report."""
+
+    regressions = []
+    for section in ("five_card_hands", "seven_card_hands", "eight_card_hands"):
+        for name, speed in report[section]["evaluations_per_second"].items():
+            baseline_speed = baseline.get(section, {}).get("evaluations_per_second", {}).get(name)
+            if baseline_speed and speed < baseline_speed * max_slowdown:
+                regressions.append("{}.{}".format(section, name))
+    return regressions
+
+
+def _card_lists(indices: np.ndarray) -> list:
+    return [[hand_evaluation.index_card(index) for index in hand] for hand in indices.tolist()]
+
+
+def _best_hand_by_rules(cards) -> PokerHand:
+    # categories are numbered in the first word of their value
+    return max((Checker.check_hand_by_rules(list(combo)) for combo in combinations(cards, 5)),
+               key=lambda hand: int(hand.value.split()[0]))
+
+
+def _category_report(counts: dict, frequencies: dict, exact: bool) -> dict:
+    # exact counts have to match, sampled counts have to be within SAMPLE_TOLERANCE standard deviations
+    hands = sum(counts.values())
+    total = sum(frequencies.values())
+    report = {}
+    for hand, frequency in frequencies.items():
+        expected = hands * frequency / total
+        if exact:
+            passed = counts[hand] == frequency
+        else:
+            deviation = np.sqrt(expected * (1 - frequency / total))
+            passed = abs(counts[hand] - expected) <= SAMPLE_TOLERANCE * deviation + 1
+        report[hand.name] = {"count": counts[hand], "expected": expected, "passed": bool(passed)}
+    return report
+
+
+def _passed(section: dict) -> bool:
+    return section["batch_mismatches"] == 0 and section["rule_mismatches"] == 0 and \
+        all(category["passed"] for category in section["categories"].values())
+
+
+def main():
+    args = parse_arguments()
+
+    rng = np.random.RandomState(args["seed"])
+
+    start_time = time.perf_counter()
+    hand_evaluation._build_tables()
+    report = {"table_build_seconds": time.perf_counter() - start_time}
+
+    report["five_card_hands"] = verify_five_card_hands(args["rule_hands"], rng)
+    report["seven_card_hands"] = verify_seven_card_hands(args["hands"], args["rule_hands"], rng)
+    report["eight_card_hands"] = verify_eight_card_hands(args["eight_card_hands"], rng)
+    report["passed"] = _passed(report["five_card_hands"]) and _passed(report["seven_card_hands"]) and \
+        report["eight_card_hands"]["mismatches"] == 0 and all(report["eight_card_hands"]["rejected"].values())
+
+    if args["baseline"] is not None:
+        with open(args["baseline"]) as file:
+            report["speed_regressions"] = compare_with_baseline(report, json.load(file), args["max_slowdown"])
+        report["passed"] = report["passed"] and len(report["speed_regressions"]) == 0
+
+    output = json.dumps(report, indent=2)
+    if args["output"] is None:
+        print(output)
+    else:
+        with open(args["output"], "w") as file:
+            file.write(output + "\n")
+        print("Verification {} in {:.1f} s, report written to: {}".format(
+            "passed" if report["passed"] else "FAILED", time.perf_counter() - start_time, args["output"]))
+
+    sys.exit(0 if report["passed"] else 1)
+
+
+if __name__ == "__main__":
+    main()
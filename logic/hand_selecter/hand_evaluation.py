@@ -0,0 +1,175 @@
+from itertools import combinations_with_replacement
+from typing import List, Tuple
+
+import numpy as np
+
+from classes.poker_card import PokerCard
+from enums.poker_hand_enum import PokerHand
+
+# Cards are encoded as PokerCard.index, rank index * 4 + suit index with ace high.
+# Strength is category << CATEGORY_SHIFT plus up to five 4-bit tie breaking ranks
+CATEGORY_SHIFT = 20
+
+# Tables cover hands of 1 to MAX_CARDS cards
+MAX_CARDS = 7
+
+_CATEGORIES = {int(hand.value.split()[0]): hand for hand in PokerHand}
+
+# Every card adds 1 << (3 * rank index) to the rank key, so the key holds count of every rank in 3 bits
+_RANK_KEYS = np.array([1 << (3 * (i // 4)) for i in range(52)], dtype=np.int64)
+_RANK_BITS = np.array([1 << (i // 4) for i in range(52)], dtype=np.int32)
+
+# Tables are built on first use
+_rank_keys: np.ndarray = None
+_rank_strengths: np.ndarray = None
+_rank_table: dict = None
+_flush_table: np.ndarray = None
+_popcount: np.ndarray = None
+
+
+def card_index(card: PokerCard) -> int:
+    return card.index
+
+
+def index_card(index: int) -> PokerCard:
+    return PokerCard.from_index(index)
+
+
+def hand_category(strength: int) -> PokerHand:
+    return _CATEGORIES[int(strength) >> CATEGORY_SHIFT]
+
+
+def evaluate(cards: List[PokerCard]) -> Tuple[int, PokerHand]:
+    """Returns strength and category of the best hand made of up to 7 known cards.
+    Higher strength is a better hand, equal strength is a tie. Raises
+    ValueError for more than 7 cards."""
+
+    strength = evaluate_indices([card.index for card in cards])
+    return strength, hand_category(strength)
+
+
+def evaluate_indices(indices) -> int:
+    """Same as evaluate for card indices, a few table lookups per hand."""
+
+    if len(indices) > MAX_CARDS:
+        raise ValueError("Hands of more than {} cards can not be evaluated: {}".format(MAX_CARDS, len(indices)))
+
+    _build_tables()
+
+    key = 0
+    suit_masks = [0, 0, 0, 0]
+    for index in indices:
+        key += 1 << (3 * (index >> 2))
+        suit_masks[index & 3] |= 1 << (index >> 2)
+
+    # with at most 7 cards a flush can not be combined with four of a kind or full house
+    strength = _rank_table[key]
+    for mask in suit_masks:
+        if _popcount[mask] >= 5:
+            return int(_flush_table[mask])
+    return strength
+
+
+def evaluate_batch(indices: np.ndarray) -> np.ndarray:
+    """Vectorized evaluate_indices for an (n, cards) array of card indices,
+    returns n strengths."""
+
+    indices = np.asarray(indices, dtype=np.intp)
+    if indices.shape[1] > MAX_CARDS:
+        raise ValueError("Hands of more than {} cards can not be evaluated: {}".format(MAX_CARDS, indices.shape[1]))
+
+    _build_tables()
+    keys = _RANK_KEYS[indices].sum(axis=1)
+    strengths = _rank_strengths[np.searchsorted(_rank_keys, keys)]
+
+    bits = _RANK_BITS[indices]
+    suits = indices & 3
+    for suit in range(4):
+        masks = np.bitwise_or.reduce(np.where(suits == suit, bits, 0), axis=1)
+        flush = _popcount[masks] >= 5
+        strengths[flush] = _flush_table[masks[flush]]
+    return strengths
+
+
+def _build_tables():
+    global _rank_keys, _rank_strengths, _rank_table, _flush_table, _popcount
+
+    if _rank_table is not None:
+        return
+
+    _popcount = np.array([bin(mask).count("1") for mask in range(1 << 13)], dtype=np.int8)
+
+    # strength of every multiset of 1 to 7 ranks, the same rank may repeat
+    table = {}
+    for cards in range(1, 8):
+        for ranks in combinations_with_replacement(range(13), cards):
+            counts = [0] * 13
+            for rank in ranks:
+                counts[rank] += 1
+            table[sum(count << (3 * rank) for rank, count in enumerate(counts))] = _rank_strength(counts)
+
+    # strength of every suit holding at least 5 ranks
+    flush_table = np.zeros(1 << 13, dtype=np.int32)
+    for mask in range(1 << 13):
+        if _popcount[mask] >= 5:
+            flush_table[mask] = _flush_strength(mask)
+
+    keys = np.array(sorted(table), dtype=np.int64)
+    _rank_keys = keys
+    _rank_strengths = np.array([table[key] for key in keys], dtype=np.int32)
+    _flush_table = flush_table
+    _rank_table = table
+
+
+def _strength(hand: PokerHand, ranks: List[int]) -> int:
+    strength = int(hand.value.split()[0]) << CATEGORY_SHIFT
+    for i, rank in enumerate(ranks[:5]):
+        strength |= rank << (4 * (4 - i))
+    return strength
+
+
+def _straight_top(mask: int) -> int:
+    # ace also counts below two
+    mask = (mask << 1) | (mask >> 12 & 1)
+    for top in range(13, 3, -1):
+        if (mask >> (top - 4)) & 0b11111 == 0b11111:
+            return top - 1
+    return -1
+
+
+def _rank_strength(counts: List[int]) -> int:
+    ranks = [rank for rank in range(12, -1, -1) if counts[rank] > 0]
+    by_count = sorted(ranks, key=lambda rank: counts[rank], reverse=True)
+    top = by_count[0]
+
+    if counts[top] >= 4:
+        return _strength(PokerHand.four_of_a_kind, [top] + [rank for rank in ranks if rank != top][:1])
+
+    pairs = [rank for rank in ranks if rank != top and counts[rank] >= 2]
+    if counts[top] == 3 and pairs:
+        return _strength(PokerHand.full_house, [top, pairs[0]])
+
+    straight = _straight_top(sum(1 << rank for rank in ranks))
+    if straight >= 0:
+        return _strength(PokerHand.straight, [straight])
+
+    if counts[top] == 3:
+        return _strength(PokerHand.three_of_a_kind, [top] + [rank for rank in ranks if rank != top][:2])
+
+    if counts[top] == 2 and pairs:
+        kickers = [rank for rank in ranks if rank not in (top, pairs[0])]
+        return _strength(PokerHand.two_pairs, [top, pairs[0]] + kickers[:1])
+
+    if counts[top] == 2:
+        return _strength(PokerHand.pair, [top] + [rank for rank in ranks if rank != top][:3])
+
+    return _strength(PokerHand.high_card, ranks[:5])
+
+
+def _flush_strength(mask: int) -> int:
+    straight = _straight_top(mask)
+    if straight == 12:
+        return _strength(PokerHand.royal_flush, [straight])
+    if straight >= 0:
+        return _strength(PokerHand.royal_straight, [straight])
+    return _strength(PokerHand.flush, [rank for rank in range(12, -1, -1) if mask >> rank & 1][:5])
@@ -0,0 +1,59 @@
+import argparse
+import time
+from itertools import combinations
+
+import numpy as np
+
+from logic.hand_selecter import hand_evaluation
+from logic.hand_selecter.hand_checking import Checker
+
+
+def parse_arguments():
+    # construct argument parser and parse arguments
+    ap = argparse.ArgumentParser()
+    ap.add_argument("-n", "--hands", required=False, type=int, help="number of random 7 card hands", default=20000)
+    ap.add_argument("--seed", required=False, type=int, help="seed of random hands", default=0)
+    return vars(ap.parse_args())
+
+
+def _best_hand_by_rules(cards) -> int:
+    # best category of all 5 card combinations, categories are numbered in the first word of their value
+    return max(int(Checker.check_hand_by_rules(list(combo)).value.split()[0]) for combo in combinations(cards, 5))
+
+
+def _hands_per_second(function, count: int) -> float:
+    start_time = time.perf_counter()
+    function()
+    return count / (time.perf_counter() - start_time)
+
+
+def main():
+    args = parse_arguments()
+
+    rng = np.random.RandomState(args["seed"])
+    indices = np.array([rng.permutation(52)[:7] for _ in range(args["hands"])])
+    index_lists = indices.tolist()
+    card_lists = [[hand_evaluation.index_card(index) for index in hand] for hand in index_lists]
+
+    start_time = time.perf_counter()
+    hand_evaluation._build_tables()
+    print("Tables built in {:.2f} s".format(time.perf_counter() - start_time))
+
+    # rule checks are slow, a tenth of the hands is enough
+    rule_count = max(1, len(card_lists) // 10)
+    rule_lists = card_lists[:rule_count]
+    results = (
+        ("rules, 21 combos", _hands_per_second(lambda: [_best_hand_by_rules(cards) for cards in rule_lists],
+                                               rule_count)),
+        ("evaluate", _hands_per_second(lambda: [hand_evaluation.evaluate(cards) for cards in card_lists],
+                                       len(card_lists))),
+        ("evaluate_indices", _hands_per_second(lambda: [hand_evaluation.evaluate_indices(hand) for hand in index_lists],
+                                               len(index_lists))),
+        ("evaluate_batch", _hands_per_second(lambda: hand_evaluation.evaluate_batch(indices), len(indices))),
+    )
+    for name, hands_per_second in results:
+        print("{:>18}: {:12.0f} hands/s, {:8.1f}x".format(name, hands_per_second, hands_per_second / results[0][1]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional
+
+import numpy as np
+
+from classes.player import Player
+from classes.poker_card import PokerCard
+from classes.seat_equity import SeatEquity
+from logic.hand_selecter import equity_calculation, hand_evaluation
+
+# Number of players at the table, same as the players trackbar of game_image_processing.setup
+MIN_PLAYERS = 2
+MAX_PLAYERS = 8
+
+# Starting hands are grouped into 13 pairs, 78 suited and 78 offsuit classes
+HAND_CLASSES = 169
+
+DEFAULT_TABLE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "preflop_equity.npy")
+
+# Table is memory-mapped on first query
+_table: np.ndarray = None
+
+
+def hand_class(cards: List[PokerCard]) -> int:
+    """Returns class of two hole cards as index into a 13x13 grid, pairs are on
+    the diagonal, suited hands above it and offsuit hands below it."""
+
+    first, second = (hand_evaluation.card_index(card) for card in cards)
+    high, low = max(first >> 2, second >> 2), min(first >> 2, second >> 2)
+    if (first & 3) == (second & 3):
+        return low * 13 + high
+    return high * 13 + low
+
+
+def class_cards(index: int) -> List[PokerCard]:
+    """Returns two hole cards representing the hand class."""
+
+    row, column = divmod(index, 13)
+    if row < column:
+        return [hand_evaluation.index_card(column * 4), hand_evaluation.index_card(row * 4)]
+    return [hand_evaluation.index_card(row * 4), hand_evaluation.index_card(column * 4 + 1)]
+
+
+def generate_table(samples: int = 20000, workers: int = None, seed: int = 0) -> np.ndarray:
+    """Simulates equity of every hand class against random hands of 1 to 7
+    opponents, spread across worker processes. Returns float32 array indexed
+    by players and hand class holding win, tie and equity, rows of fewer than
+    MIN_PLAYERS players are NaN."""
+
+    tasks = [(players, index) for players in range(MIN_PLAYERS, MAX_PLAYERS + 1) for index in range(HAND_CLASSES)]
+    seeds = np.random.SeedSequence(seed).spawn(len(tasks))
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        results = executor.map(_simulate_class, [players for players, _ in tasks], [index for _, index in tasks],
+                               [samples] * len(tasks), seeds, chunksize=8)
+
+        table = np.full((MAX_PLAYERS + 1, HAND_CLASSES, 3), np.nan, dtype=np.float32)
+        for (players, index), equity in zip(tasks, results):
+            table[players, index] = (equity.win, equity.tie, equity.equity)
+    return table
+
+
+def write_table(table: np.ndarray, filename: str = DEFAULT_TABLE_PATH):
+    np.save(filename, table)
+
+
+def load_table(filename: str = DEFAULT_TABLE_PATH) -> Optional[np.ndarray]:
+    """Memory-maps table written by write_table. Returns None if the file does
+    not exist or holds a table of another shape."""
+
+    if not os.path.isfile(filename):
+        return None
+
+    table = np.load(filename, mmap_mode="r")
+    if table.shape != (MAX_PLAYERS + 1, HAND_CLASSES, 3) or table.dtype != np.float32:
+        return None
+    return table
+
+
+def setup(filename: str = DEFAULT_TABLE_PATH):
+    global _table
+
+    _table = load_table(filename)
+
+
+def preflop_equity(player: Player, players: int) -> Optional[SeatEquity]:
+    """Returns preflop equity of the player's hole cards against players - 1
+    random hands, None if cards are unknown or the table is missing."""
+
+    global _table
+
+    if _table is None:
+        setup()
+    if _table is None or len(player.cards) != 2 or any(card.is_unknown() for card in player.cards):
+        return None
+    if not MIN_PLAYERS <= players <= MAX_PLAYERS:
+        return None
+
+    win, tie, equity = _table[players, hand_class(player.cards)]
+    return SeatEquity(float(win), float(tie), float(equity))
+
+
+def _simulate_class(players: int, index: int, samples: int, seed: np.random.SeedSequence) -> SeatEquity:
+    seats = [class_cards(index)] + [[] for _ in range(players - 1)]
+    return equity_calculation.calculate_equity(seats, [], samples=samples, seed=seed)[0]
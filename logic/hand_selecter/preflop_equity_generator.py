@@ -0,0 +1,31 @@
+import argparse
+import os
+import time
+
+from logic.hand_selecter import preflop_equity
+
+
+def parse_arguments():
+    # construct argument parser and parse arguments
+    ap = argparse.ArgumentParser()
+    ap.add_argument("-o", "--output", required=False, help="path to preflop equity table",
+                    default=preflop_equity.DEFAULT_TABLE_PATH)
+    ap.add_argument("-s", "--samples", required=False, type=int, help="number of deals per hand class and players",
+                    default=20000)
+    ap.add_argument("-w", "--workers", required=False, type=int, help="number of processes, all cores by default")
+    ap.add_argument("--seed", required=False, type=int, help="seed of random deals", default=0)
+    return vars(ap.parse_args())
+
+
+def main():
+    args = parse_arguments()
+
+    start_time = time.perf_counter()
+    table = preflop_equity.generate_table(args["samples"], args["workers"], args["seed"])
+    preflop_equity.write_table(table, args["output"])
+    print("Preflop equity table written to: {} in {:.1f} s, {} processes".format(
+        args["output"], time.perf_counter() - start_time, args["workers"] or os.cpu_count()))
+
+
+if __name__ == "__main__":
+    main()
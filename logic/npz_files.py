@@ -0,0 +1,13 @@
+import numpy as np
+
+
+def save_npz(filename: str, compressed: bool = False, **arrays) -> None:
+    """Saves arrays to an .npz archive at exactly filename. np.savez appends
+    .npz to file names without it, so the archive is written through an open
+    file instead."""
+
+    with open(filename, "wb") as file:
+        if compressed:
+            np.savez_compressed(file, **arrays)
+        else:
+            np.savez(file, **arrays)